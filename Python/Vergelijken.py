@@ -1,8 +1,13 @@
 import streamlit as st
 import plotly.graph_objects as go
 import pandas as pd
+import numpy as np
 import os
-import re
+
+from curve_charts import MAX_CELLS, MAX_POINTS, capped_figure, curve_trace, heatmap_trace
+from curve_compare import calculate_differences, curve_tensor, pairwise_correlations, pairwise_differences
+from excel_cache import load_excel
+from file_catalog import get_catalog
 
 st.set_page_config(page_title="Vergelijken", page_icon="📈", layout="wide")
 
@@ -11,38 +16,45 @@ st.title("Vergelijken")
 
 # Give a title an icon and make streamlit app wide by default
 
-file1 = st.text_input("Enter the first file name (e.g., file1.csv):", "C:\\Repos\\Data\\Curves\\Book_2.xlsx")
-file2 = st.text_input("Enter the second file name (e.g., file2.csv):", "C:\\Repos\\Data\\Curves\\Book_3.xlsx")
+mode = st.radio("Compare:", ["Two books", "Multiple books"], horizontal=True)
+if mode == "Two books":
+    file1 = st.text_input("Enter the first file name (e.g., file1.csv):", "C:\\Repos\\Data\\Curves\\Book_2.xlsx")
+    file2 = st.text_input("Enter the second file name (e.g., file2.csv):", "C:\\Repos\\Data\\Curves\\Book_3.xlsx")
 sheetname = st.selectbox("Select the sheet name:", ["AC ZC YC", "Sheet1", "Sheet2"])
 
 
 
-# Given a path it scans for all the files with and extension and a regex pattern
+# Given a path it returns all the files with and extension and a regex pattern, from an index that is
+# only refreshed for folders that changed since the previous rerun
 def get_files(path, extension, pattern):
-    files = []
-    for file in os.listdir(path):
-        if file.endswith(extension) and re.match(pattern, file):
-            files.append(os.path.join(path, file))
-    return files
-
+    catalog = get_catalog(path, extension, recursive=False)
+    return [os.path.join(path, entry.name) for entry in catalog.query(pattern)]
 
-# Read the file to 
-df1 = pd.read_excel(file1, sheet_name=sheetname)
-df2 = pd.read_excel(file2, sheet_name=sheetname)
 
+# Show a figure and, when it was downsampled, the full resolution data on request
+def show_figure(fig, ui_col, title, full_data, downsampled):
+    ui_col.plotly_chart(fig)
+    if downsampled and ui_col.checkbox(f"Show the full data of {title}", key=f"full_data_{title}"):
+        ui_col.dataframe(full_data)
 
 # Plot a curve chart given a title, list of x values, and list of y values
 def plot_curve_chart(title, x_values, y_values, color, ui_col):
-    fig = go.Figure()
-    fig.add_trace(go.Scatter(x=x_values, y=y_values, mode='lines+markers', name=title, line=dict(color=color)))
-    fig.update_layout(title=title, xaxis_title='Maturity', yaxis_title='bp', showlegend=True)
-    ui_col.plotly_chart(fig)
+    def build(max_points):
+        fig = go.Figure()
+        fig.add_trace(curve_trace(x_values, y_values, max_points, mode='lines+markers', name=title, line=dict(color=color)))
+        fig.update_layout(title=title, xaxis_title='Maturity', yaxis_title='bp', showlegend=True)
+        return fig
+    fig, max_points = capped_figure(build, MAX_POINTS)
+    show_figure(fig, ui_col, title, pd.DataFrame({'Maturity': x_values, 'bp': y_values}), len(y_values) > max_points)
 
 # method to plot a heatmap given a title, list of x values, and list of y values
 def plot_heatmap(title, x_values, y_values, color, ui_col):
-    fig = go.Figure(data=go.Heatmap(z=y_values, x=x_values, y=x_values, colorscale=color))
-    fig.update_layout(title=title, xaxis_title='Curves', yaxis_title='Curves')
-    ui_col.plotly_chart(fig)
+    def build(max_cells):
+        fig = go.Figure(data=heatmap_trace(y_values, x_values, x_values, max_cells, colorscale=color))
+        fig.update_layout(title=title, xaxis_title='Curves', yaxis_title='Curves')
+        return fig
+    fig, max_cells = capped_figure(build, MAX_CELLS)
+    show_figure(fig, ui_col, title, pd.DataFrame(y_values, index=x_values, columns=x_values), np.size(y_values) > max_cells)
 
 # Give me a method that given a 2 dataframe, calculartes a correlation matrix and plot it as a heatmap
 def plot_correlation_heatmap(df1, df2, title, color, ui_col):
@@ -50,11 +62,72 @@ def plot_correlation_heatmap(df1, df2, title, color, ui_col):
     # sort the correlation matrix by the second column
     sorted_correlation_matrix = correlation_matrix.sort_values(ascending=True)
 
-    fig = go.Figure(data=go.Heatmap(z=sorted_correlation_matrix.values.reshape(1, -1), x=df1.columns, y=['Correlation'], colorscale=color))
-    fig.update_layout(title=title, xaxis_title='Curves', yaxis_title='Correlation')
-    ui_col.plotly_chart(fig)
+    def build(max_cells):
+        fig = go.Figure(data=heatmap_trace(sorted_correlation_matrix.values.reshape(1, -1), sorted_correlation_matrix.index,
+                                           ['Correlation'], max_cells, colorscale=color))
+        fig.update_layout(title=title, xaxis_title='Curves', yaxis_title='Correlation')
+        return fig
+    fig, max_cells = capped_figure(build, MAX_CELLS)
+    show_figure(fig, ui_col, title, sorted_correlation_matrix, len(sorted_correlation_matrix) > max_cells)
     return sorted_correlation_matrix
 
+# Load the books and stack their curves, memoized across reruns on the paths, modification times and sheet
+@st.cache_data(max_entries=8)
+def load_books(books, sheet):
+    frames = [load_excel(path, sheet_name=sheet) for path, _ in books]
+    return curve_tensor(frames)
+
+@st.cache_data(max_entries=8)
+def book_correlations(books, sheet):
+    tensor, _, _ = load_books(books, sheet)
+    return pairwise_correlations(tensor)
+
+@st.cache_data(max_entries=8)
+def book_differences(books, sheet):
+    tensor, _, _ = load_books(books, sheet)
+    return pairwise_differences(tensor)
+
+if mode == "Multiple books":
+    folder = st.text_input("Enter the folder with the books:", "C:\\Repos\\Data\\Curves")
+    pattern = st.text_input("Enter the file name pattern (regex):", r"Book_\d+")
+    paths = sorted(get_files(folder, ".xlsx", pattern))
+    books = tuple((path, os.path.getmtime(path)) for path in paths)
+    names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+    if len(books) < 2:
+        st.warning(f"Found {len(books)} books matching {pattern} in {folder}, at least 2 are needed.")
+        st.stop()
+    st.write(f"Comparing {len(books)} books: {', '.join(names)}")
+
+    # Only the selected analysis is computed, the other one runs when it is selected
+    analysis = st.radio("Analysis:", ["Correlation", "Differences"], horizontal=True)
+    _, curves, _ = load_books(books, sheetname)
+    if not curves:
+        st.warning(f"The books have no curves in common on sheet {sheetname}.")
+        st.stop()
+
+    if analysis == "Correlation":
+        correlations = book_correlations(books, sheetname)
+        plot_heatmap("Mean correlation between the books", names, np.nanmean(correlations, axis=0), 'YlGnBu', st)
+        curve = st.selectbox("Select the curve:", curves)
+        plot_heatmap(f"Correlation between the books for {curve}", names, correlations[curves.index(curve)], 'YlGnBu', st)
+    else:
+        differences = book_differences(books, sheetname)
+        measure = st.selectbox("Select the measure:", ["cum_abs_diff", "abs_diff_mean", "percentage"])
+        # Every book against the previous one, e.g. M02 against M01
+        steps = pd.DataFrame({f"{names[i]} vs {names[i - 1]}": differences[measure][:, i, i - 1] for i in range(1, len(names))},
+                             index=pd.Index(curves, name="curve_name"))
+        st.dataframe(steps.sort_values(steps.columns[-1], ascending=False))
+        # Pairs without a value for any curve, e.g. books of different lengths for cum_abs_diff, stay empty instead of 0
+        totals = np.nansum(differences[measure], axis=0)
+        totals[np.isnan(differences[measure]).all(axis=0)] = np.nan
+        plot_heatmap(f"Total {measure} between the books", names, totals, 'Reds', st)
+    st.stop()
+
+# Read the file to a dataframe, cached on path, modification time and sheet so reruns do not parse the workbooks again
+df1 = load_excel(file1, sheet_name=sheetname)
+df2 = load_excel(file2, sheet_name=sheetname)
+
+
 sorted_corr_matrix = plot_correlation_heatmap(df1.iloc[:, 2:],df2.iloc[:, 2:], 'Correlation Matrix', 'YlGnBu', st)
 
 col1, col2 = st.columns(2) 
@@ -103,24 +176,7 @@ differences = []
 
 
 
-def calculate_differences(df1, df2):
-    # New DataFrame to store differences
-    dfdelta = pd.DataFrame({"curve_name": [], "percentage": [], "abs_diff_mean": [], "cum_abs_diff": []})
-    for col in df1.columns[2:]:
-        if col in df2.columns:
-            diff = df1[col] - df2[col]
-            st.text(f"{col} {sum(abs(diff))}")	
-            percentage_diff = (diff / df2[col]) * 100
-            abs_diff = abs(diff)
-            
-            dfdelta = pd.concat([dfdelta, pd.DataFrame({"curve_name": [col], "percentage": [percentage_diff.mean()], "abs_diff_mean": [abs_diff.mean()], "cum_abs_diff": [sum(abs(diff))]})], ignore_index=True)
-
-            # Sort by name and then by abs difference in descending order
-            dfdelta = dfdelta.sort_values(by="curve_name")
-            dfdelta = dfdelta.sort_values(by="cum_abs_diff", ascending=False)
-
-    return dfdelta
-
+# Differences of all common curves at once, shown below as a single table
 delta = calculate_differences(df1, df2)
 
 # print delta with no index
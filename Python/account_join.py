@@ -0,0 +1,160 @@
+# Join two CSV tables on account numbers that are padded differently, e.g. FROM '00012345' and ACCOUNT_NR 12345
+# python account_join.py left_table.csv right_table.csv --left-key FROM --right-key ACCOUNT_NR --output joined_table.csv
+import argparse
+import glob
+import math
+import os
+import tempfile
+
+import pandas as pd
+
+# Internal column holding the normalized key while joining
+KEY_COLUMN = "__join_key"
+
+# Rows read at a time from the inputs
+CHUNK_SIZE = 200_000
+
+# Rough ratio between the memory of a table read as text and its file size
+MEMORY_FACTOR = 4
+
+
+def normalize_keys(values, key_type="int", width=8):
+    """
+    Normalize account numbers once, so '12345', '00012345' and 12345 become the same key.
+
+    Parameters:
+        values (array): The key column.
+        key_type (str): 'int' for nullable 64-bit integers, 'bytes' for zero-padded fixed-width bytes
+            (for keys with letters, matches str.zfill(width) like the old padding).
+        width (int): Width of the 'bytes' keys.
+
+    Returns:
+        pd.Series: The keys, missing for empty values.
+    """
+    text = pd.Series(values).astype("string").str.strip()
+    text = text.mask(text == "")
+    if key_type == "bytes":
+        return text.str.zfill(width).str.encode("ascii")
+    if key_type != "int":
+        raise ValueError(f"Unknown key type {key_type}, expected 'int' or 'bytes'.")
+
+    keys = pd.to_numeric(text, errors="coerce")
+    invalid = (keys.isna() & text.notna()) | (keys.notna() & (keys % 1 != 0))
+    if invalid.any():
+        raise ValueError(f"{int(invalid.sum())} keys are not whole numbers, e.g. {text[invalid].iloc[0]!r}; "
+                         f"use key_type='bytes'.")
+    return keys.astype("Int64")
+
+
+# A method to spread keys over partitions; missing keys all go to partition 0
+def partition_ids(keys, partitions):
+    if keys.dtype == "Int64":
+        values = keys.to_numpy(dtype="int64", na_value=-1)
+    else:
+        values = keys.fillna(b"").to_numpy(dtype=object)
+    return pd.util.hash_array(values) % partitions
+
+
+def join_frames(left, right, how="inner", suffixes=("_x", "_y")):
+    """Join two frames that have KEY_COLUMN; missing keys never match, like in SQL."""
+    right = right[right[KEY_COLUMN].notna()]
+    if how == "inner":
+        left = left[left[KEY_COLUMN].notna()]
+    return left.merge(right, on=KEY_COLUMN, how=how, suffixes=suffixes).drop(columns=KEY_COLUMN)
+
+
+def read_table(path, key, key_type, width, chunksize=None):
+    """Read a CSV as text, so values are written back exactly as they were, with the normalized key added."""
+    def add_key(df):
+        df[KEY_COLUMN] = normalize_keys(df[key], key_type, width)
+        return df
+
+    if chunksize is None:
+        return add_key(pd.read_csv(path, dtype=str, keep_default_na=False))
+    return (add_key(chunk) for chunk in pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize))
+
+
+def join_csv(left_path, right_path, left_key, right_key, output_path, how="inner", key_type="int", width=8,
+             memory_mb=512, partitions=None, spill_dir=None, chunksize=CHUNK_SIZE):
+    """
+    Join two CSV files on a normalized account key and stream the result to output_path.
+
+    Tables that fit in memory_mb are joined in memory. Larger ones are split into partitions on
+    the hash of the key, spilled to disk, and joined one partition at a time, so only one
+    partition of each table is in memory. Values are copied as text; only the keys are normalized.
+
+    Parameters:
+        left_path (str): CSV with the left table.
+        right_path (str): CSV with the right table.
+        left_key (str): Key column of the left table, e.g. FROM.
+        right_key (str): Key column of the right table, e.g. ACCOUNT_NR.
+        output_path (str): CSV file the joined rows are written to.
+        how (str): 'inner' or 'left'.
+        key_type (str): 'int' or 'bytes', see normalize_keys.
+        width (int): Width of the 'bytes' keys.
+        memory_mb (int): Memory budget for the tables.
+        partitions (int): Number of partitions; by default derived from the file sizes and memory_mb.
+        spill_dir (str): Folder for the partition files, defaults to the system temp folder.
+        chunksize (int): Rows read at a time while partitioning.
+
+    Returns:
+        dict: Rows of both inputs, rows written and the number of partitions used.
+    """
+    if how not in ("inner", "left"):
+        raise ValueError(f"how must be 'inner' or 'left', got {how}.")
+
+    estimated_mb = (os.path.getsize(left_path) + os.path.getsize(right_path)) * MEMORY_FACTOR / 2 ** 20
+    if partitions is None:
+        partitions = max(1, math.ceil(estimated_mb / memory_mb))
+
+    stats = {"left_rows": 0, "right_rows": 0, "rows": 0, "partitions": partitions}
+    with open(output_path, "w", newline="") as output:
+        if partitions == 1:
+            left = read_table(left_path, left_key, key_type, width)
+            right = read_table(right_path, right_key, key_type, width)
+            stats["left_rows"], stats["right_rows"] = len(left), len(right)
+            joined = join_frames(left, right, how)
+            joined.to_csv(output, index=False, chunksize=chunksize)
+            stats["rows"] = len(joined)
+        else:
+            with tempfile.TemporaryDirectory(dir=spill_dir) as spill:
+                columns = {}
+                for side, path, key in (("left", left_path, left_key), ("right", right_path, right_key)):
+                    for i, chunk in enumerate(read_table(path, key, key_type, width, chunksize)):
+                        columns.setdefault(side, chunk.iloc[:0])
+                        stats[f"{side}_rows"] += len(chunk)
+                        for part, piece in chunk.groupby(partition_ids(chunk[KEY_COLUMN], partitions)):
+                            piece.to_pickle(os.path.join(spill, f"{side}-{part:05d}-{i:06d}.pkl"))
+
+                # The header comes from joining the empty tables, every partition then appends its rows
+                join_frames(columns["left"], columns["right"], how).to_csv(output, index=False)
+                for part in range(partitions):
+                    left_files = sorted(glob.glob(os.path.join(spill, f"left-{part:05d}-*.pkl")))
+                    if not left_files:
+                        continue
+                    right_files = sorted(glob.glob(os.path.join(spill, f"right-{part:05d}-*.pkl")))
+                    left = pd.concat([pd.read_pickle(f) for f in left_files], ignore_index=True)
+                    right = pd.concat([pd.read_pickle(f) for f in right_files], ignore_index=True) if right_files else columns["right"]
+                    joined = join_frames(left, right, how)
+                    joined.to_csv(output, index=False, header=False)
+                    stats["rows"] += len(joined)
+
+    print(f"Joined {stats['left_rows']} and {stats['right_rows']} rows into {stats['rows']} rows "
+          f"in {stats['partitions']} partition(s), saved to {output_path}")
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Join two CSV tables on normalized account numbers.")
+    parser.add_argument("left")
+    parser.add_argument("right")
+    parser.add_argument("--left-key", default="FROM")
+    parser.add_argument("--right-key", default="ACCOUNT_NR")
+    parser.add_argument("--how", choices=["inner", "left"], default="inner")
+    parser.add_argument("--key-type", choices=["int", "bytes"], default="int")
+    parser.add_argument("--memory-mb", type=int, default=512)
+    parser.add_argument("--output", default="joined_table.csv")
+    args = parser.parse_args()
+
+    join_csv(args.left, args.right, args.left_key, args.right_key, args.output, how=args.how,
+             key_type=args.key_type, memory_mb=args.memory_mb)
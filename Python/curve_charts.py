@@ -0,0 +1,130 @@
+# Plotly figures for Vergelijken that stay light in the browser: WebGL for long series, LTTB downsampling
+# and a cap on the figure payload
+import math
+import warnings
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+# Series with more points than this are drawn with WebGL (Scattergl) instead of SVG
+WEBGL_THRESHOLD = 1000
+
+# Points per series and cells per heatmap sent to the browser, before the payload cap
+MAX_POINTS = 2000
+MAX_CELLS = 250_000
+
+# Maximum size of the figure JSON; the point budget is halved until the figure fits
+MAX_PAYLOAD_BYTES = 2_000_000
+MIN_POINTS = 100
+
+
+def lttb(x, y, n_out):
+    """
+    Return the indices of the points kept by Largest-Triangle-Three-Buckets downsampling.
+
+    The first and last points are always kept; from every bucket in between the point
+    that forms the largest triangle with the previous kept point and the average of the
+    next bucket is kept, which preserves peaks and the shape of the line.
+
+    Parameters:
+        x (array): Numeric x values in increasing order.
+        y (array): Numeric y values without NaN.
+        n_out (int): Number of points to keep.
+
+    Returns:
+        np.ndarray: Sorted indices of the kept points.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # n_out - 2 buckets between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    indices = np.empty(n_out, dtype=int)
+    indices[0], indices[-1] = 0, n - 1
+    previous = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        area = np.abs((x[previous] - avg_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (avg_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        indices[i + 1] = previous
+    return indices
+
+
+def downsample_series(x_values, y_values, max_points=MAX_POINTS):
+    """Downsample a series with LTTB to at most max_points, skipping missing y values."""
+    x = np.asarray(x_values)
+    y = np.asarray(y_values, dtype=float)
+    if len(y) <= max_points:
+        return x, y
+
+    valid = np.flatnonzero(~np.isnan(y))
+    # Non-numeric x values such as maturity labels are spaced by position
+    numeric_x = np.asarray(pd.to_numeric(pd.Series(x[valid]), errors="coerce"), dtype=float)
+    if np.isnan(numeric_x).any():
+        numeric_x = valid.astype(float)
+    keep = valid[lttb(numeric_x, y[valid], max_points)]
+    return x[keep], y[keep]
+
+
+def downsample_matrix(z, x_labels, y_labels, max_cells=MAX_CELLS):
+    """Average z over square blocks so it has at most max_cells cells, labels take the first of their block."""
+    z = np.asarray(z, dtype=float)
+    rows, cols = z.shape
+    step = math.ceil(math.sqrt(rows * cols / max_cells)) if rows * cols > max_cells else 1
+    row_step, col_step = min(step, rows), min(step, cols)
+    # A thin matrix, e.g. one row of correlations, can only shrink along its long side
+    col_step = max(col_step, math.ceil(cols / max(1, max_cells // math.ceil(rows / row_step))))
+    row_step = max(row_step, math.ceil(rows / max(1, max_cells // math.ceil(cols / col_step))))
+    if row_step == 1 and col_step == 1:
+        return z, list(x_labels), list(y_labels)
+
+    # Pad to whole blocks with NaN so the block means ignore the padding
+    padded = np.full((math.ceil(rows / row_step) * row_step, math.ceil(cols / col_step) * col_step), np.nan)
+    padded[:rows, :cols] = z
+    blocks = padded.reshape(padded.shape[0] // row_step, row_step, padded.shape[1] // col_step, col_step)
+    with warnings.catch_warnings():
+        # Blocks with only NaN stay NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        z = np.nanmean(blocks, axis=(1, 3))
+    return z, list(x_labels)[::col_step], list(y_labels)[::row_step]
+
+
+def curve_trace(x_values, y_values, max_points=MAX_POINTS, **kwargs):
+    """Return a Scatter trace, downsampled to max_points and drawn with WebGL when it is long."""
+    x, y = downsample_series(x_values, y_values, max_points)
+    trace = go.Scattergl if len(y) > WEBGL_THRESHOLD else go.Scatter
+    return trace(x=x, y=y, **kwargs)
+
+
+def heatmap_trace(z, x_labels, y_labels, max_cells=MAX_CELLS, **kwargs):
+    """Return a Heatmap trace with z reduced to at most max_cells cells."""
+    z, x_labels, y_labels = downsample_matrix(z, x_labels, y_labels, max_cells)
+    return go.Heatmap(z=z, x=x_labels, y=y_labels, **kwargs)
+
+
+def capped_figure(build, max_points, max_bytes=MAX_PAYLOAD_BYTES, min_points=MIN_POINTS):
+    """
+    Build a figure whose JSON payload stays under max_bytes.
+
+    Parameters:
+        build (callable): Returns the figure for a point budget, build(max_points).
+        max_points (int): Starting point (or cell) budget, halved while the payload is too large.
+        max_bytes (int): Maximum size of the figure JSON.
+        min_points (int): Budget below which the figure is returned even if it is too large.
+
+    Returns:
+        tuple: (figure, point budget used).
+    """
+    fig = build(max_points)
+    while len(fig.to_json()) > max_bytes and max_points > min_points:
+        max_points = max(min_points, max_points // 2)
+        fig = build(max_points)
+    return fig, max_points
@@ -0,0 +1,166 @@
+# Curve comparisons used by Vergelijken, without Streamlit so they can also run in batch reports
+# python curve_compare.py Book_2.xlsx Book_3.xlsx --sheet "AC ZC YC" --output differences.csv
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Curve columns start after the maturity columns
+FIRST_CURVE_COLUMN = 2
+
+
+def common_curve_columns(df1, df2, first_column=FIRST_CURVE_COLUMN):
+    """Return the curve columns of df1 that are also in df2, in the order of df1."""
+    columns2 = set(df2.columns)
+    return [col for col in df1.columns[first_column:] if col in columns2]
+
+
+def calculate_differences(df1, df2, first_column=FIRST_CURVE_COLUMN):
+    """
+    Calculate the differences between the curves present in both frames.
+
+    All common curve columns are compared at once as matrices, the rows are matched on
+    the index like a column subtraction does.
+
+    Parameters:
+        df1 (pd.DataFrame): Source curves, one column per curve.
+        df2 (pd.DataFrame): Target curves.
+        first_column (int): Position of the first curve column, the columns before it are maturities.
+
+    Returns:
+        pd.DataFrame: curve_name, percentage (mean % difference against df2), abs_diff_mean and
+        cum_abs_diff per curve, sorted by cum_abs_diff descending and then by curve_name.
+    """
+    columns = common_curve_columns(df1, df2, first_column)
+    source = df1[columns].astype(float)
+    target = df2[columns].astype(float)
+
+    diff = source - target
+    abs_diff = diff.abs()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percentage = (diff / target * 100).mean()
+
+    dfdelta = pd.DataFrame({
+        "curve_name": columns,
+        "percentage": percentage.to_numpy(),
+        "abs_diff_mean": abs_diff.mean().to_numpy(),
+        # A missing value makes the cumulative difference missing, the curve lengths differ
+        "cum_abs_diff": abs_diff.sum(skipna=False).to_numpy(),
+    })
+
+    # Sort by abs difference in descending order and then by name, once
+    return dfdelta.sort_values(by=["cum_abs_diff", "curve_name"], ascending=[False, True], ignore_index=True)
+
+
+def curve_tensor(frames, first_column=FIRST_CURVE_COLUMN):
+    """
+    Stack the curves present in every book into one curves x books x maturities array.
+
+    The rows of the books are matched on the index, like calculate_differences does;
+    a book without a row has NaN there. The maturity of a row comes from the first book
+    that has it.
+
+    Parameters:
+        frames (list): DataFrames of the books, the first column holds the maturities.
+        first_column (int): Position of the first curve column.
+
+    Returns:
+        tuple: (tensor, curves, maturities) with tensor of shape (len(curves), len(frames), len(maturities)).
+    """
+    curves = list(frames[0].columns[first_column:])
+    for df in frames[1:]:
+        curves = common_curve_columns(frames[0][curves], df, first_column=0)
+
+    index = frames[0].index
+    for df in frames[1:]:
+        index = index.union(df.index)
+
+    tensor = np.stack([df[curves].reindex(index).to_numpy(dtype=float).T for df in frames], axis=1)
+    maturities = frames[0].iloc[:, 0].reindex(index)
+    for df in frames[1:]:
+        maturities = maturities.combine_first(df.iloc[:, 0].reindex(index))
+    maturities = maturities.to_numpy()
+    return tensor, curves, maturities
+
+
+def pairwise_correlations(tensor):
+    """
+    Correlate every book with every other book per curve, over the maturities both have.
+
+    Parameters:
+        tensor (np.ndarray): curves x books x maturities, see curve_tensor.
+
+    Returns:
+        np.ndarray: curves x books x books Pearson correlations, NaN with fewer than 2 values;
+        empty (0 x books x books) when the books have no curves in common.
+    """
+    curves, books, _ = tensor.shape
+    result = np.full((curves, books, books), np.nan)
+    if curves == 0:
+        return result
+    valid = ~np.isnan(tensor)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # One book against all books at a time keeps memory at curves x books x maturities
+        for i in range(books):
+            mask = valid[:, i:i + 1, :] & valid
+            count = mask.sum(axis=-1)
+            x = np.where(mask, tensor[:, i:i + 1, :], 0.0)
+            y = np.where(mask, tensor, 0.0)
+            dx = np.where(mask, x - (x.sum(axis=-1) / count)[..., None], 0.0)
+            dy = np.where(mask, y - (y.sum(axis=-1) / count)[..., None], 0.0)
+            corr = (dx * dy).sum(axis=-1) / np.sqrt((dx * dx).sum(axis=-1) * (dy * dy).sum(axis=-1))
+            result[:, i, :] = np.where(count >= 2, corr, np.nan)
+    return result
+
+
+def pairwise_differences(tensor):
+    """
+    Compare every book with every other book per curve, like calculate_differences for all pairs.
+
+    A pair is compared over the rows that book i or book j has, i.e. where one of them has
+    a value for any curve; the rows only other (longer) books have are left out, so
+    [c, i, j] equals calculate_differences(book_i, book_j) for curve c.
+
+    Parameters:
+        tensor (np.ndarray): curves x books x maturities, see curve_tensor.
+
+    Returns:
+        dict: percentage, abs_diff_mean and cum_abs_diff, each curves x books x books where
+        [c, i, j] compares book i (source) with book j (target); empty when there are no common curves.
+    """
+    curves, books, _ = tensor.shape
+    result = {name: np.full((curves, books, books), np.nan) for name in ("percentage", "abs_diff_mean", "cum_abs_diff")}
+    if curves == 0:
+        return result
+    # books x maturities, True where the book has the row
+    has_row = (~np.isnan(tensor)).any(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i in range(books):
+            diff = tensor[:, i:i + 1, :] - tensor
+            abs_diff = np.abs(diff)
+            percentage = diff / tensor * 100
+            result["percentage"][:, i, :] = np.nansum(percentage, axis=-1) / (~np.isnan(percentage)).sum(axis=-1)
+            result["abs_diff_mean"][:, i, :] = np.nansum(abs_diff, axis=-1) / (~np.isnan(abs_diff)).sum(axis=-1)
+            # A missing value on a row of the pair makes the cumulative difference missing, like skipna=False
+            pair_rows = has_row[i] | has_row
+            missing = (np.isnan(abs_diff) & pair_rows).any(axis=-1)
+            result["cum_abs_diff"][:, i, :] = np.where(missing, np.nan, np.nansum(abs_diff, axis=-1))
+    return result
+
+
+if __name__ == "__main__":
+    from excel_cache import load_excel
+
+    parser = argparse.ArgumentParser(description="Compare the curves of two workbooks.")
+    parser.add_argument("file1", help="Source workbook.")
+    parser.add_argument("file2", help="Target workbook.")
+    parser.add_argument("--sheet", default="AC ZC YC", help="Sheet with the curves.")
+    parser.add_argument("--output", help="CSV file to write the differences to, printed when omitted.")
+    args = parser.parse_args()
+
+    delta = calculate_differences(load_excel(args.file1, args.sheet), load_excel(args.file2, args.sheet))
+    if args.output:
+        delta.to_csv(args.output, index=False)
+        print(f"Differences of {len(delta)} curves saved to {args.output}")
+    else:
+        print(delta.to_string(index=False))
@@ -0,0 +1,107 @@
+# Cached Excel loading for the Streamlit apps, which rerun the whole script on every interaction
+# pip install pyarrow  (only needed for the Parquet sidecars)
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Number of parsed sheets kept in memory
+MAX_ENTRIES = 16
+
+# Folder next to the workbook holding the Parquet sidecars
+SIDECAR_DIR = ".excel_cache"
+
+_frames = OrderedDict()
+_lock = threading.Lock()
+
+
+# A method to build the cache key, a changed or replaced workbook gets a new key
+def cache_key(path, sheet_name):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, sheet_name)
+
+
+# A method to get the sidecar path of a sheet, the key is part of the name so stale sidecars are never read
+# The cleaned sheet name is for people, the hash of repr(sheet_name) keeps "AC ZC YC", "AC_ZC_YC", 0 and "0" apart
+def sidecar_path(key):
+    path, mtime_ns, size, sheet_name = key
+    safe_sheet = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(sheet_name))
+    sheet_hash = hashlib.sha1(repr(sheet_name).encode()).hexdigest()[:8]
+    name = f"{os.path.basename(path)}.{safe_sheet}-{sheet_hash}.{size}-{mtime_ns}.parquet"
+    return os.path.join(os.path.dirname(path), SIDECAR_DIR, name)
+
+
+def read_sidecar(key):
+    path = sidecar_path(key)
+    if not os.path.exists(path):
+        return None
+    try:
+        return pd.read_parquet(path)
+    except Exception as e:
+        print(f"Ignoring unreadable sidecar {path}: {e}")
+        return None
+
+
+def write_sidecar(key, df):
+    """Write the sheet as Parquet next to the workbook, removing sidecars of older versions."""
+    path = sidecar_path(key)
+    stale_prefix = os.path.basename(path).rsplit(".", 2)[0] + "."
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Parquet only takes text column names, write to a temporary file so readers never see half a file
+        df.rename(columns=str).to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+    except Exception as e:
+        # Read-only shares, pyarrow not installed or mixed-type columns: keep the in-memory cache only
+        print(f"Could not write sidecar {path}: {e}")
+        return
+    for name in os.listdir(os.path.dirname(path)):
+        if name.startswith(stale_prefix) and name != os.path.basename(path):
+            os.remove(os.path.join(os.path.dirname(path), name))
+
+
+def load_excel(path, sheet_name=0, sidecar=True, max_entries=MAX_ENTRIES):
+    """
+    Read a sheet of an Excel file, cached on path, modification time and sheet name.
+
+    Parsed sheets stay in memory with least-recently-used eviction and are also written
+    as a Parquet sidecar, so a new session reloads the sheet without parsing the .xlsx.
+    The returned DataFrame is shared between callers and must not be modified in place.
+
+    Parameters:
+        path (str): The path to the Excel file.
+        sheet_name (str or int, optional): The sheet name or index to read. Defaults to the first sheet (0).
+        sidecar (bool, optional): Read and write the Parquet sidecar. Defaults to True.
+        max_entries (int, optional): Number of sheets kept in memory.
+
+    Returns:
+        pd.DataFrame: The data from the sheet.
+    """
+    key = cache_key(path, sheet_name)
+    with _lock:
+        if key in _frames:
+            _frames.move_to_end(key)
+            return _frames[key]
+
+    df = read_sidecar(key) if sidecar else None
+    if df is None:
+        df = pd.read_excel(path, sheet_name=sheet_name)
+        if sidecar:
+            write_sidecar(key, df)
+        # The sidecar has text column names, use them for the in-memory copy too so both paths agree
+        df = df.rename(columns=str)
+
+    with _lock:
+        _frames[key] = df
+        _frames.move_to_end(key)
+        while len(_frames) > max_entries:
+            _frames.popitem(last=False)
+    return df
+
+
+def clear_cache():
+    """Forget all parsed sheets; the sidecars stay on disk."""
+    with _lock:
+        _frames.clear()
@@ -0,0 +1,140 @@
+# Indexed file discovery for the curve share, refreshed incrementally instead of listing every folder again
+import bisect
+import os
+import re
+import threading
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+# Dates in file names such as Book_2_20240131.xlsx or M01 2024-01-31.xlsx
+DATE_PATTERN = re.compile(r"(?<!\d)(\d{4})[-_]?(\d{2})[-_]?(\d{2})(?!\d)")
+# Book names such as Book_2 or M01
+BOOK_PATTERN = re.compile(r"(?<![A-Za-z])(Book_\d+|M\d{1,2})(?!\d)", re.IGNORECASE)
+
+FileEntry = namedtuple("FileEntry", ["path", "name", "size", "mtime", "date", "book"])
+
+
+# Patterns are compiled once, Streamlit asks for the same few patterns on every rerun
+@lru_cache(maxsize=64)
+def compile_pattern(pattern):
+    return re.compile(pattern)
+
+
+# A method to get the date and book tokens of a file name, None when the name has none
+def parse_tokens(name):
+    book = BOOK_PATTERN.search(name)
+    for match in DATE_PATTERN.finditer(name):
+        try:
+            return date(*map(int, match.groups())), book.group(1) if book else None
+        except ValueError:
+            continue
+    return None, book.group(1) if book else None
+
+
+class FileCatalog:
+    """Index of the files with an extension below a folder: path, size, mtime and date/book tokens.
+
+    refresh() only lists the folders whose mtime changed since the previous refresh; a folder
+    mtime changes when files are added, removed or renamed in it. Files overwritten in place
+    keep their folder mtime, refresh(full=True) lists everything again.
+    """
+
+    def __init__(self, root, extension, recursive=True):
+        self.root = os.path.normpath(root)
+        self.extension = extension
+        self.recursive = recursive
+        self.entries = {}
+        self._folders = {}
+        self._by_date = []
+        self._lock = threading.Lock()
+
+    def _scan_folder(self, folder):
+        """Replace the entries of one folder and return its subfolders."""
+        prefix = os.path.join(folder, "")
+        for path in [p for p in self.entries if os.path.dirname(p) == folder]:
+            del self.entries[path]
+        subfolders = []
+        with os.scandir(folder) as it:
+            for entry in it:
+                if entry.is_dir(follow_symlinks=False):
+                    subfolders.append(entry.path)
+                elif entry.name.endswith(self.extension) and entry.is_file():
+                    stat = entry.stat()
+                    file_date, book = parse_tokens(entry.name)
+                    self.entries[prefix + entry.name] = FileEntry(prefix + entry.name, entry.name, stat.st_size,
+                                                                  stat.st_mtime, file_date, book)
+        return subfolders
+
+    def refresh(self, full=False):
+        """Update the index from the folders that changed, returns self so calls can be chained."""
+        with self._lock:
+            changed = False
+            seen = set()
+            folders = [self.root]
+            while folders:
+                folder = folders.pop()
+                try:
+                    mtime = os.stat(folder).st_mtime_ns
+                except FileNotFoundError:
+                    continue
+                seen.add(folder)
+                if full or self._folders.get(folder, (None,))[0] != mtime:
+                    subfolders = self._scan_folder(folder)
+                    self._folders[folder] = (mtime, subfolders)
+                    changed = True
+                if self.recursive:
+                    folders.extend(self._folders[folder][1])
+
+            # Forget folders that were removed
+            for folder in set(self._folders) - seen:
+                del self._folders[folder]
+                for path in [p for p in self.entries if os.path.dirname(p) == folder]:
+                    del self.entries[path]
+                changed = True
+
+            if changed:
+                self._by_date = sorted((e.date, e.path) for e in self.entries.values() if e.date is not None)
+        return self
+
+    def query(self, pattern=None, start_date=None, end_date=None, book=None):
+        """
+        Return the indexed files matching all the given filters, sorted on path.
+
+        Parameters:
+            pattern (str): Regex matched against the start of the file name, like re.match.
+            start_date (date): First date of the date token, files without one are skipped.
+            end_date (date): Last date of the date token.
+            book (str): Book token, e.g. Book_2 or M01, compared without case.
+
+        Returns:
+            list: FileEntry per matching file.
+        """
+        with self._lock:
+            if start_date is not None or end_date is not None:
+                lo = bisect.bisect_left(self._by_date, (start_date or date.min, ""))
+                hi = bisect.bisect_right(self._by_date, (end_date or date.max, "\uffff"))
+                entries = [self.entries[path] for _, path in self._by_date[lo:hi]]
+            else:
+                entries = list(self.entries.values())
+
+        if pattern is not None:
+            regex = compile_pattern(pattern)
+            entries = [e for e in entries if regex.match(e.name)]
+        if book is not None:
+            entries = [e for e in entries if e.book is not None and e.book.lower() == book.lower()]
+        return sorted(entries, key=lambda e: e.path)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(root, extension, recursive=True):
+    """Return the catalog of root for extension, shared by all callers in the process and refreshed."""
+    key = (os.path.abspath(root), extension, recursive)
+    with _catalogs_lock:
+        if key not in _catalogs:
+            _catalogs[key] = FileCatalog(root, extension, recursive)
+        catalog = _catalogs[key]
+    return catalog.refresh()
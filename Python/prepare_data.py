@@ -1,25 +1,122 @@
 # Generate a method to read an Excel file into a pandas DataFrame
+# pip install openpyxl
+# pip install python-calamine  (optional, faster engine used when installed)
+import itertools
+import importlib.util
+import os
+import sys
+from collections import defaultdict
+
+import numpy as np
 import pandas as pd
 
-def read_excel_to_dataframe(file_path, sheet_name=0):
+def read_excel_to_dataframe(file_path, sheet_name=0, columns=None, nrows=None):
 	"""
 	Reads an Excel file into a pandas DataFrame.
 
+	The column filter and row limit are applied while parsing, so unneeded columns and rows
+	are never converted. The calamine engine is used when python-calamine is installed,
+	otherwise the sheet is streamed with openpyxl in read-only mode.
+
 	Parameters:
 		file_path (str): The path to the Excel file.
 		sheet_name (str or int, optional): The sheet name or index to read. Defaults to the first sheet (0).
+		columns (str or callable, optional): Only read the columns whose name contains this string or
+			a maturity column (see filter_columns_containing_string_and_maturity), or for which
+			columns(name) is True. Defaults to all columns.
+		nrows (int, optional): Only read the first nrows data rows. Defaults to all rows.
 
 	Returns:
 		pd.DataFrame: The data from the Excel file as a pandas DataFrame.
 	"""
+	if isinstance(columns, str):
+		columns = column_matches(columns)
 	try:
-		df = pd.read_excel(file_path, sheet_name=sheet_name)
-		return df
+		if importlib.util.find_spec("python_calamine") is not None:
+			return pd.read_excel(file_path, sheet_name=sheet_name, usecols=columns, nrows=nrows, engine="calamine")
+		return read_excel_streaming(file_path, sheet_name, columns, nrows)
 	except Exception as e:
 		print(f"An error occurred while reading the Excel file: {e}")
 		return None
 
 
+# A method to build the column predicate of filter_columns_containing_string_and_maturity
+def column_matches(string):
+    return lambda col: string in str(col) or 'maturity' in str(col).lower()
+
+
+def read_excel_streaming(file_path, sheet_name=0, columns=None, nrows=None):
+    """
+    Reads the selected columns and first rows of a sheet with openpyxl in read-only mode.
+
+    Only the cells between the first and last selected column are parsed, and reading stops
+    after nrows rows. The result matches pd.read_excel: headers without a name become
+    'Unnamed: <position>', duplicate headers get .1, .2 suffixes (see dedup_header), blank
+    rows in between are kept as missing values and blank rows and columns at the end are dropped.
+
+    Parameters:
+        file_path (str): The path to the Excel file.
+        sheet_name (str or int, optional): The sheet name or index to read.
+        columns (callable, optional): Predicate on the header name of the columns to keep.
+        nrows (int, optional): Maximum number of data rows to read.
+
+    Returns:
+        pd.DataFrame: The selected data.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        header = next(sheet.iter_rows(min_row=1, max_row=1, values_only=True), ())
+        names = dedup_header([f"Unnamed: {i}" if name in (None, "") else name for i, name in enumerate(header)])
+        header_width = max((i + 1 for i, name in enumerate(header) if name not in (None, "")), default=0)
+        keep = [i for i, name in enumerate(names) if columns is None or columns(name)]
+        if not keep:
+            return pd.DataFrame()
+
+        first, last = keep[0], keep[-1]
+        offsets = [i - first for i in keep]
+        rows = sheet.iter_rows(min_row=2, min_col=first + 1, max_col=last + 1, values_only=True)
+        data = [[row[i] if i < len(row) else None for i in offsets] for row in itertools.islice(rows, nrows)]
+    finally:
+        workbook.close()
+
+    # Drop the empty rows at the end, read-only sheets often report a larger dimension
+    while data and all(value is None for value in data[-1]):
+        data.pop()
+    # Blank columns after the last header are only kept up to the last one with a value, like pd.read_excel
+    while keep and keep[-1] >= header_width and all(row[-1] is None for row in data):
+        keep.pop()
+        for row in data:
+            row.pop()
+    if not keep:
+        return pd.DataFrame()
+    df = pd.DataFrame(data, columns=[names[i] for i in keep])
+    # Empty cells are NaN in pd.read_excel, not None, so an empty column becomes float
+    for name in df.columns[df.dtypes == object]:
+        df[name] = df[name].where(df[name].notna(), np.nan)
+    return df.infer_objects()
+
+
+# A method to rename duplicate headers the way pd.read_excel does: a, a, a.1 becomes a, a.2, a.1
+def dedup_header(names):
+    names = list(names)
+    counts = defaultdict(int)
+    # Unnamed columns get their suffix after all named ones, like in pandas
+    unnamed = [i for i, name in enumerate(names) if str(name).startswith("Unnamed: ")]
+    for i in [i for i in range(len(names)) if i not in unnamed] + unnamed:
+        name = original = names[i]
+        count = counts[name]
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts[name]
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+
 # Generate a method to filter all column names containing a specific string and also the maturity columns
 def filter_columns_containing_string_and_maturity(df, string):
     """
@@ -33,7 +130,8 @@ def filter_columns_containing_string_and_maturity(df, string):
         pd.DataFrame: A DataFrame with only the columns containing the specified string and maturity columns.
     """
     if df is not None:
-        filtered_columns = [col for col in df.columns if string in col or 'maturity' in col.lower()]
+        matches = column_matches(string)
+        filtered_columns = [col for col in df.columns if matches(col)]
         return df[filtered_columns]
     else:
         print("The DataFrame is None.")
@@ -73,28 +171,63 @@ def merge_dataframes_on_first_column(df1, df2):
         return None
 
 
-# read excel file1.xlsx and file2.xlsx into dataframes and filter columns containing 'A' and join the dataframes
-def main():
-    file1_path = 'C:\\Repos\\Data\\Curves\\Book_1.xlsx'
-    file2_path = 'C:\\Repos\\Data\\Curves\\Book_2.xlsx'
+# a method to align many books on their maturity in one indexed join
+def merge_books(frames, names=None, maturity_column=None, how="inner", asof=False, tolerance=None):
+    """
+    Aligns N books on their maturity, with the columns of every book suffixed by its name.
 
-    # Read the Excel files into DataFrames
-    df1 = read_excel_to_dataframe(file1_path)
-    df2 = read_excel_to_dataframe(file2_path)
+    Every book gets its maturity as a sorted index once and all books are joined in a single
+    concat, so no intermediate pairwise merges are kept in memory.
 
-    # Filter columns containing 'A'
-    filtered_df1 = filter_columns_containing_string_and_maturity(df1, 'swap')
-    filtered_df2 = filter_columns_containing_string_and_maturity(df2, 'swap')
+    Parameters:
+        frames (list): The DataFrames of the books.
+        names (list, optional): Suffix per book, e.g. ['Book_1', 'Book_2']. Defaults to book1, book2, ...
+        maturity_column (str, optional): The maturity column. Defaults to the first column of each book.
+        how (str, optional): 'inner' (default, like merge_dataframes_on_first_column) only keeps the
+            maturities in all books, 'outer' keeps every maturity.
+        asof (bool, optional): Align every book to the nearest maturity of the first book, for books
+            with different tenors. The result has the maturities of the first book.
+        tolerance (float, optional): With asof, the largest maturity distance that is still aligned.
 
-    # Join the DataFrames on the common columns
-    if filtered_df1 is not None and filtered_df2 is not None:
-        merged_df = merge_dataframes_on_first_column(filtered_df1, filtered_df2)
-        if merged_df is not None:
-            print(merged_df.head(50))
-        else:
-            print("The merged DataFrame is None.")
-    else:
+    Returns:
+        pd.DataFrame: One row per maturity (the sorted index) and one column per book column.
+    """
+    names = names or [f"book{i + 1}" for i in range(len(frames))]
+    if len(names) != len(frames):
+        raise ValueError(f"Got {len(names)} names for {len(frames)} books.")
+
+    indexed = []
+    for df, name in zip(frames, names):
+        key = maturity_column or df.columns[0]
+        df = df.set_index(key).sort_index()
+        if not df.index.is_unique:
+            raise ValueError(f"Book {name} has duplicate maturities in {key}.")
+        indexed.append(df.add_suffix(f"_{name}"))
+
+    if asof:
+        reference = indexed[0].index
+        indexed = [indexed[0]] + [df.reindex(reference, method="nearest", tolerance=tolerance) for df in indexed[1:]]
+
+    merged = pd.concat(indexed, axis=1, join=how)
+    merged.index.name = indexed[0].index.name
+    return merged.sort_index()
+
+
+# read the curve books into dataframes, keep the columns containing 'swap' and align them on maturity
+def main(file_paths=None):
+    file_paths = file_paths or ['C:\\Repos\\Data\\Curves\\Book_1.xlsx', 'C:\\Repos\\Data\\Curves\\Book_2.xlsx']
+
+    # Read only the columns containing 'swap' and the maturity columns into DataFrames
+    frames = [read_excel_to_dataframe(path, columns='swap') for path in file_paths]
+    if any(df is None for df in frames):
         print("One of the DataFrames is None.")
+        return
+
+    # Join all the books on their maturity at once, keeping the maturities present in every book
+    names = [os.path.splitext(os.path.basename(path))[0] for path in file_paths]
+    merged_df = merge_books(frames, names, how="inner")
+    print(merged_df.head(50))
 
 
-main()
+if __name__ == "__main__":
+    main(sys.argv[1:])
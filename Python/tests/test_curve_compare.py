@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from curve_compare import calculate_differences, curve_tensor, pairwise_differences
+
+MEASURES = ["percentage", "abs_diff_mean", "cum_abs_diff"]
+
+
+def make_book(rows, seed):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Maturity": np.arange(1, rows + 1),
+        "Label": [f"M{i}" for i in range(rows)],
+        "EUR": 1 + rng.random(rows),
+        "USD": 1 + rng.random(rows),
+    })
+
+
+@pytest.fixture
+def books():
+    # The third book has 3 extra maturity rows, the last one lacks a row
+    return [make_book(10, 1), make_book(10, 2), make_book(13, 3), make_book(9, 4)]
+
+
+def test_pairwise_differences_match_calculate_differences(books):
+    tensor, curves, _ = curve_tensor(books)
+    result = pairwise_differences(tensor)
+    for i, book_i in enumerate(books):
+        for j, book_j in enumerate(books):
+            expected = calculate_differences(book_i, book_j).set_index("curve_name").loc[curves]
+            for measure in MEASURES:
+                np.testing.assert_allclose(result[measure][:, i, j], expected[measure].to_numpy())
+
+
+def test_equal_books_have_a_cumulative_difference(books):
+    tensor, _, _ = curve_tensor(books)
+    cum = pairwise_differences(tensor)["cum_abs_diff"]
+    assert not np.isnan(cum[:, 0, 1]).any()
+    assert np.isnan(cum[:, 0, 2]).all()
+
+
+def test_maturities_come_from_all_books(books):
+    _, _, maturities = curve_tensor(books)
+    assert list(maturities) == list(range(1, 14))
@@ -0,0 +1,236 @@
+# Benchmarks for the hierarchy scripts on synthetic PS_TREE exports
+# python benchmark_hierarchy.py generate tree.csv --depth 6 --fan-out 4
+# python benchmark_hierarchy.py run --sizes small medium --output bench.json
+import argparse
+import csv
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+import pandas as pd
+
+import transform_hierarchy_accounts as tha
+from hierarchy_expand import iter_blocks
+from hierarchy_levels import MAX_LEVEL, backfill_levels
+from hierarchy_ranges import parse_range
+
+# Tree shapes used by "run", from a few hundred to ~20k input rows
+SIZES = {
+    "small": dict(depth=4, fan_out=4, range_width=10),
+    "medium": dict(depth=5, fan_out=6, range_width=20),
+    "large": dict(depth=6, fan_out=6, range_width=20),
+}
+
+# fill_columns rescans the frame for every missing level, so it is skipped above this size
+MAX_LEGACY_ROWS = 5000
+
+
+def generate_ps_tree(path, depth=5, fan_out=4, range_width=20, ranges_per_leaf=2,
+                     leaf_probability=0.1, level_fill=0.2, detail_probability=0.1,
+                     single_probability=0.2, seed=42):
+    """
+    Write a synthetic PS_TREE_ACCOUNT-shaped CSV and return its number of rows.
+
+    Parameters:
+    path (str): Output CSV path.
+    depth (int): Deepest level used, at most 13 (Level_13).
+    fan_out (int): Number of children of every non-leaf node.
+    range_width (int): Maximum number of accounts in one Account_Range.
+    ranges_per_leaf (int): Maximum number of Account_Range rows below a leaf.
+    leaf_probability (float): Chance that a node above the deepest level is a leaf anyway.
+    level_fill (float): Chance that a node row also carries its ancestor levels, otherwise they are blank.
+    detail_probability (float): Chance of a row without Level_Nr after a node row.
+    single_probability (float): Chance that a range row holds a single account instead of a range.
+    seed (int): Random seed, the same arguments always give the same file.
+
+    Returns:
+    int: Number of data rows written.
+    """
+    if not 1 <= depth <= MAX_LEVEL:
+        raise ValueError(f"Depth must be between 1 and {MAX_LEVEL}, got {depth}.")
+
+    rng = random.Random(seed)
+    columns = [f"Level_{i}" for i in range(1, MAX_LEVEL + 1)] + ["Level_Nr", "Node_ID", "Node_Description", "Account_Range"]
+    counters = {"node": 0, "rows": 0, "account": 0}
+
+    def write_row(writer, levels, level_nr="", node_id="", description="", account_range=""):
+        writer.writerow(levels + [""] * (MAX_LEVEL - len(levels)) + [level_nr, node_id, description, account_range])
+        counters["rows"] += 1
+
+    def write_node(writer, path_names, level):
+        counters["node"] += 1
+        name = f"N{level}_{counters['node']}"
+        names = path_names + [name]
+        levels = [n if rng.random() < level_fill else "" for n in path_names] + [name]
+        write_row(writer, levels, level, 100000 + counters["node"], f"Node {name}")
+        if rng.random() < detail_probability:
+            write_row(writer, [], description=f"Details of {name}")
+
+        if level == depth or (level > 1 and rng.random() < leaf_probability):
+            for _ in range(rng.randint(1, ranges_per_leaf)):
+                prefix = rng.choice("ABCD")
+                start = counters["account"]
+                counters["account"] += range_width
+                if rng.random() < single_probability:
+                    account_range = f"[{prefix}{start:06d}]"
+                else:
+                    end = start + rng.randint(0, range_width - 1)
+                    account_range = f"[{prefix}{start:06d} - {prefix}{end:06d}]"
+                write_row(writer, [], account_range=account_range)
+        else:
+            for _ in range(fan_out):
+                write_node(writer, names, level + 1)
+
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        write_node(writer, [], 1)
+    return counters["rows"]
+
+
+def measure(func, repeat=1):
+    """Return the best wall time of func over repeat runs and its peak traced memory in MB."""
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds.append(time.perf_counter() - start)
+
+    # Memory is traced in a separate run so tracemalloc does not skew the timings
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(seconds), peak / (1024 * 1024)
+
+
+def read_tree(csv_file_path):
+    """Read a PS_TREE CSV the same way calculate_hierarchy does."""
+    df = pd.read_csv(csv_file_path, skip_blank_lines=True)
+    df["Level_Nr"] = df["Level_Nr"].astype("Int64")
+    return df
+
+
+def bench_calculate_hierarchy(csv_file_path):
+    tha.calculate_hierarchy(csv_file_path, tha.last_col_name)
+
+
+def bench_get_range(ranges):
+    parse_range.cache_clear()
+    for text in ranges:
+        tha.get_range(text)
+
+
+def bench_fill_columns(df):
+    df = df.copy()
+    for index, row in df.iterrows():
+        if pd.notna(row["Level_Nr"]):
+            tha.fill_columns(df, index, row["Level_Nr"])
+
+
+def bench_backfill_levels(df):
+    backfill_levels(df.copy())
+
+
+def bench_apply_results(df, keysn):
+    for from_value, to_value, res_values in iter_blocks(df, keysn, tha.last_col_name, tha.get_range):
+        tha.apply_results(res_values, from_value, to_value, df)
+
+
+def run_size(name, params, directory, repeat=1):
+    """Generate the tree for one size and benchmark every function on it."""
+    csv_file_path = os.path.join(directory, f"PS_TREE_ACCOUNT_BENCH_{name}.csv")
+    rows = generate_ps_tree(csv_file_path, **params)
+    df = read_tree(csv_file_path)
+    ranges = df[tha.last_col_name].dropna().tolist()
+    keysn = [0] + [i + 1 for i in df.index[df[tha.last_col_name].notna()]]
+    keysn.reverse()
+
+    benchmarks = {
+        "calculate_hierarchy": lambda: bench_calculate_hierarchy(csv_file_path),
+        "get_range": lambda: bench_get_range(ranges),
+        "backfill_levels": lambda: bench_backfill_levels(df),
+        "apply_results": lambda: bench_apply_results(df, keysn),
+    }
+    if rows <= MAX_LEGACY_ROWS:
+        benchmarks["fill_columns"] = lambda: bench_fill_columns(df)
+
+    results = []
+    for benchmark, func in benchmarks.items():
+        seconds, peak_mb = measure(func, repeat)
+        print(f"{name:<8} {rows:>8} rows  {benchmark:<20} {seconds:>9.3f}s {peak_mb:>9.1f} MB")
+        results.append({"size": name, "rows": rows, "params": params, "benchmark": benchmark,
+                        "seconds": seconds, "peak_mb": peak_mb})
+    return results
+
+
+def code_version():
+    """Return the short git commit of this checkout, or None outside a git repository."""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, output=None, repeat=1):
+    """Benchmark the hierarchy functions for the given size names and optionally save the results as JSON."""
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "version": code_version(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for name in sizes:
+            report["results"].extend(run_size(name, SIZES[name], directory, repeat))
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Benchmark results saved to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the hierarchy scripts on synthetic PS_TREE files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="Write a synthetic PS_TREE CSV.")
+    generate.add_argument("path")
+    generate.add_argument("--depth", type=int, default=5)
+    generate.add_argument("--fan-out", type=int, default=4)
+    generate.add_argument("--range-width", type=int, default=20)
+    generate.add_argument("--ranges-per-leaf", type=int, default=2)
+    generate.add_argument("--leaf-probability", type=float, default=0.1)
+    generate.add_argument("--level-fill", type=float, default=0.2)
+    generate.add_argument("--detail-probability", type=float, default=0.1)
+    generate.add_argument("--single-probability", type=float, default=0.2)
+    generate.add_argument("--seed", type=int, default=42)
+
+    run = subparsers.add_parser("run", help="Time and memory-profile the hierarchy functions.")
+    run.add_argument("--sizes", nargs="+", choices=SIZES, default=["small", "medium"])
+    run.add_argument("--repeat", type=int, default=1)
+    run.add_argument("--output", help="JSON file to save the results to.")
+
+    args = parser.parse_args()
+    # Keep the per-row log messages out of the measurements
+    logging.getLogger().setLevel(logging.WARNING)
+
+    if args.command == "generate":
+        rows = generate_ps_tree(args.path, args.depth, args.fan_out, args.range_width, args.ranges_per_leaf,
+                                args.leaf_probability, args.level_fill, args.detail_probability,
+                                args.single_probability, args.seed)
+        print(f"Generated {rows} rows in {args.path}")
+    else:
+        run_benchmarks(args.sizes, args.output, args.repeat)
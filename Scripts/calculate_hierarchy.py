@@ -1,23 +1,26 @@
+import argparse
 import pandas as pd
+from hierarchy_expand import expand_blocks, find_keys
+from hierarchy_levels import FILL_MODES, backfill_levels
+from hierarchy_output import OUTPUT_FORMATS, HierarchyWriter, output_path
 
 pd.set_option('future.no_silent_downcasting', True)
 
+parser = argparse.ArgumentParser(description="Fix and denormalize a PS_TREE_BU hierarchy export.")
+parser.add_argument("--fill-mode", choices=FILL_MODES, default="first",
+                    help="'first' keeps the first non-null level value from the top, 'ancestor' uses the nearest ancestor of the branch.")
+parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="csv",
+                    help="Write new_data as csv, parquet or arrow (the last two need pyarrow).")
+args = parser.parse_args()
+
 print("Fixing hierarchy...")
 
 last_col_name = "BU_Range"
 csv_file = "PS_TREE_BU_AC_RAP_BUN_AEGONNL_AEGON_01_01_2022.csv"
 df = pd.read_csv(csv_file)
-new_df = pd.DataFrame(columns=df.columns)
-
-keysx = [ -1 ]
-i = 0
-for index, row in df.iterrows():
-    if not pd.isna(row[last_col_name]):
-        keysx.append(i)
-    i = i + 1
 
-for x in range(len(keysx)-1):
-    df.iloc[keysx[x]+1:keysx[x+1], :-1] = df.iloc[keysx[x]+1:keysx[x+1], :-1].ffill()
+# find the rows with a range and forward fill the rows between them
+keysx = find_keys(df, last_col_name)
 
 keysn = [x + 1 for x in keysx]
 
@@ -32,27 +35,8 @@ levels = [ "Level_2", "Level_3", "Level_4", "Level_5", "Level_6", "Level_7", "Le
 
 
 
-def get_last_first_value_not_null(df, col_name, row_nr):
-    print(f"Getting first row value not null for {col_name} @ {row_nr}")
-    for i in range(0, row_nr):
-        if col_name in df.columns and pd.notna(df.at[i, col_name]):
-            return df.at[i, col_name]
-    return None
-
-def fill_columns(df, index, level):
-    # print 2nd row df
-    row = df.iloc[index]
-    for i in range(2, level + 1):
-        col_name = f"Level_{i}"
-        if pd.isna(row[col_name]):
-            fix_value = get_last_first_value_not_null(df, col_name, index)
-            df.at[index, col_name] = fix_value
-            print(f"Fixing {col_name} @ {i} with {fix_value} .")
-
-# iterate through df rows if Level_Nr is not empty call funtion fill_columns()
-for index, row in df.iterrows():
-    if pd.notna(row["Level_Nr"]):
-        fill_columns(df, index, row["Level_Nr"])
+# fill the missing levels of every row with a Level_Nr in one pass per level column
+backfill_levels(df, first_level=2, fill_mode=args.fill_mode)
 
 print(df.head(30))
 
@@ -91,37 +75,15 @@ def get_range(text):
         return [text]
 
 
-# create a new df with same columns as df
-def apply_results(res_values, from_value, to_value):
-    res = pd.DataFrame(columns=df.columns)
-    for i in range(from_value, to_value-1):
-        for val in res_values:
-            new_row = df.iloc[i].copy()
-            new_row[last_col_name] = val
-            res = pd.concat([res, new_row.to_frame().T], ignore_index=True)
-    return res
-
-
 # iterate keysn
-results = []
-for x in range(len(keysn)-1):
-    if (keysn[x] - keysn[x+1]) == 1:       
-        c = df.at[keysn[x+1], last_col_name]
-        results.extend(get_range(c))
-    else:
-        if (x > 0):
-            c = df.at[keysn[x]-1, last_col_name]
-            results.extend(get_range(c))        
-        res1 = apply_results(results, keysn[x+1], keysn[x])
-
-        new_df = pd.concat([new_df, res1], ignore_index=True)
-        results = []
+new_df = expand_blocks(df, keysn, last_col_name, get_range)
 
 # Add column filename with the name of the original CSV file
 new_df['filename'] = csv_file
 
 # Result information
-new_df.to_csv("new_data.csv", index=False)
+with HierarchyWriter(output_path("new_data.csv", args.output_format), args.output_format, last_col_name) as writer:
+    writer.write(new_df)
 
 # print(new_df)
 
@@ -1,7 +1,17 @@
 # Generate a script that combines 2 csv files with the same row structure the filenames are passed as arguments
+# python captain_csv.py <file1.csv> <file2.csv> ... <output.csv>
+# python captain_csv.py "extracts/*.csv.gz" combined.csv.gz
+import argparse
+import glob
+import gzip
+import os
 import sys
 import pandas as pd
 
+# Size of the blocks copied from the inputs to the output
+BUFFER_SIZE = 1024 * 1024
+BOM = b"\xef\xbb\xbf"
+
 def combine_csv_files(file1, file2, output_file):
     # Read both CSV files
     df1 = pd.read_csv(file1)
@@ -14,17 +24,99 @@ def combine_csv_files(file1, file2, output_file):
     combined_df.to_csv(output_file, index=False)
     print(f"Combined CSV saved to {output_file}")
 
-if __name__ == "__main__":
-    if len(sys.argv) != 4:
-        print("Usage: python captain_csv.py <file1.csv> <file2.csv> <output.csv>")
-        sys.exit(1)
-    
-    file1 = sys.argv[1]
-    file2 = sys.argv[2]
-    output_file = sys.argv[3]
-    
-    combine_csv_files(file1, file2, output_file)
+# A method to open a csv file in binary mode, gzip compressed when the name ends with .gz
+def open_csv(path, mode="rb"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+# A method to expand the glob patterns in the input list, keeping the given order
+# The output file is skipped when a pattern matches it, naming it as an input is an error
+def expand_inputs(inputs, output_file=None):
+    output = os.path.abspath(output_file) if output_file else None
+    files = []
+    for pattern in inputs:
+        if glob.has_magic(pattern):
+            matches = [path for path in sorted(glob.glob(pattern)) if os.path.abspath(path) != output]
+        elif os.path.abspath(pattern) == output:
+            raise ValueError(f"Output file {output_file} is also an input.")
+        else:
+            matches = [pattern]
+        if not matches:
+            raise FileNotFoundError(f"No files match {pattern}")
+        files.extend(matches)
+    return files
+
+# A method to compare headers regardless of a byte order mark or line ending
+def normalize_header(header):
+    return header.removeprefix(BOM).rstrip(b"\r\n")
 
+def concat_csv_files(input_files, output_file, buffer_size=BUFFER_SIZE):
+    """
+    Concatenate any number of CSV files with the same header into output_file.
 
+    The rows are copied as bytes in blocks of buffer_size, so memory use does not depend
+    on the file sizes. The header is written once, from the first file. Names ending in
+    .gz are read or written gzip compressed.
 
+    Parameters:
+    input_files (list): CSV files or glob patterns, concatenated in this order. A pattern that
+        also matches output_file, e.g. *.csv into merged.csv, skips it.
+    output_file (str): Path of the combined CSV file.
+    buffer_size (int): Number of bytes copied at a time.
 
+    Returns:
+    list: (file, rows) for every input, rows being the number of lines after the header.
+    """
+    input_files = expand_inputs(input_files, output_file)
+    if not input_files:
+        raise ValueError("No input files given.")
+
+    # Check all headers before writing, so a mismatch does not leave a partial output
+    headers = []
+    for path in input_files:
+        with open_csv(path) as f:
+            headers.append(f.readline())
+    expected = normalize_header(headers[0])
+    for path, header in zip(input_files, headers):
+        if normalize_header(header) != expected:
+            raise ValueError(f"Header of {path} does not match {input_files[0]}:\n"
+                             f"{normalize_header(header).decode(errors='replace')}\n"
+                             f"{expected.decode(errors='replace')}")
+
+    report = []
+    with open_csv(output_file, "wb") as out:
+        out.write(headers[0] if headers[0].endswith(b"\n") else headers[0] + b"\n")
+        for path in input_files:
+            rows = 0
+            last = b"\n"
+            with open_csv(path) as f:
+                f.readline()
+                while True:
+                    block = f.read(buffer_size)
+                    if not block:
+                        break
+                    out.write(block)
+                    rows += block.count(b"\n")
+                    last = block[-1:]
+            # Files without a trailing newline would otherwise run into the next file
+            if last != b"\n":
+                out.write(b"\n")
+                rows += 1
+            report.append((path, rows))
+            print(f"{path}: {rows} rows")
+
+    print(f"Combined {sum(rows for _, rows in report)} rows from {len(report)} files saved to {output_file}")
+    return report
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concatenate CSV files with the same header.")
+    parser.add_argument("inputs", nargs="+", help="CSV files or glob patterns, .gz files are decompressed.")
+    parser.add_argument("output", help="Combined CSV file, gzip compressed when it ends with .gz.")
+    args = parser.parse_args()
+
+    try:
+        concat_csv_files(args.inputs, args.output)
+    except (OSError, ValueError) as e:
+        print(e)
+        sys.exit(1)
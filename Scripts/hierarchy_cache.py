@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+
+CACHE_FILE = ".hierarchy_cache.json"
+
+# Modules whose code determines the content of the *_new files
+CODE_FILES = ("transform_hierarchy_accounts.py", "hierarchy_expand.py", "hierarchy_levels.py",
+              "hierarchy_ranges.py", "hierarchy_output.py")
+
+
+def file_hash(path, block_size=1024 * 1024):
+    """Return the sha256 of a file, read in blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_version():
+    """Return a hash of the hierarchy modules, so a code change invalidates the cache."""
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_FILES:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+class HierarchyCache:
+    """Manifest of processed PS_TREE files: content hash, parameters and code version per input."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, CACHE_FILE)
+        self.version = code_version()
+        self.entries = {}
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                self.entries = json.load(f).get("files", {})
+
+    def _key(self, input_path):
+        return os.path.relpath(input_path, self.directory)
+
+    def lookup(self, input_path, digest, params, output_path):
+        """Return the cached entry if input, parameters and code are unchanged and the output still exists."""
+        entry = self.entries.get(self._key(input_path))
+        if (entry is not None and entry["hash"] == digest and entry["params"] == params
+                and entry["version"] == self.version and os.path.exists(output_path)):
+            return entry
+        return None
+
+    def record(self, input_path, digest, params, output_path, rows_in, rows_out):
+        self.entries[self._key(input_path)] = {
+            "hash": digest,
+            "params": params,
+            "version": self.version,
+            "output": os.path.relpath(output_path, self.directory),
+            "rows_in": rows_in,
+            "rows_out": rows_out,
+        }
+
+    def save(self):
+        # Write to a temporary file first so an interrupted run does not leave a broken manifest
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"files": self.entries}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def clean(self):
+        """Forget all entries and remove the manifest; the *_new outputs are left in place."""
+        self.entries = {}
+        if os.path.exists(self.path):
+            os.remove(self.path)
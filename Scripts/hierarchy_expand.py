@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+
+def find_keys(df, last_col_name):
+    """Return keysx, -1 followed by the positions of the rows with a range, and forward fill the rows between them.
+
+    The rows between two key rows are filled per block; the key rows and the rows after
+    the last key stay as they are. The last column is never filled.
+    """
+    is_key = df[last_col_name].notna().to_numpy()
+    keysx = [-1] + np.flatnonzero(is_key).tolist()
+
+    block = np.cumsum(is_key)
+    between = ~is_key & (block < len(keysx) - 1)
+    if between.any():
+        columns = df.columns[:-1]
+        df.loc[between, columns] = df.loc[between, columns].groupby(block[between]).ffill()
+    return keysx
+
+
+def iter_blocks(df, keysn, last_col_name, get_range):
+    """Yield (from_row, to_row, values) for every leaf block, in the same order as the original loop."""
+    results = []
+    for x in range(len(keysn) - 1):
+        if (keysn[x] - keysn[x + 1]) == 1:
+            c = df.at[keysn[x + 1], last_col_name]
+            results.extend(get_range(c))
+        else:
+            if (x > 0):
+                c = df.at[keysn[x] - 1, last_col_name]
+                results.extend(get_range(c))
+            yield keysn[x + 1], keysn[x], results
+            results = []
+
+
+def block_positions(from_value, to_value, res_values):
+    """Return the row positions and range values of one block, one entry per output row."""
+    rows = np.arange(from_value, to_value - 1)
+    values = np.empty(len(res_values), dtype=object)
+    values[:] = res_values
+    return np.repeat(rows, len(values)), np.tile(values, len(rows))
+
+
+def take_rows(df, positions, values, last_col_name):
+    """Materialize the rows at positions with the last column replaced by values."""
+    res = df.iloc[positions].reset_index(drop=True)
+    res[last_col_name] = values
+    return res
+
+
+def expand_block(df, from_value, to_value, res_values, last_col_name):
+    """Repeat the rows of a single block once per range value."""
+    positions, values = block_positions(from_value, to_value, res_values)
+    return take_rows(df, positions, values, last_col_name)
+
+
+def iter_expanded_chunks(df, keysn, last_col_name, get_range, chunk_size=100000):
+    """Yield the expanded rows one leaf block at a time, split into frames of at most chunk_size rows."""
+    for from_value, to_value, res_values in iter_blocks(df, keysn, last_col_name, get_range):
+        positions, values = block_positions(from_value, to_value, res_values)
+        for start in range(0, len(positions), chunk_size):
+            stop = start + chunk_size
+            yield take_rows(df, positions[start:stop], values[start:stop], last_col_name)
+
+
+def expand_blocks(df, keysn, last_col_name, get_range):
+    """Expand all leaf blocks with one gather over the source rows instead of a concat per row."""
+    positions = []
+    values = []
+    for from_value, to_value, res_values in iter_blocks(df, keysn, last_col_name, get_range):
+        block_rows, block_values = block_positions(from_value, to_value, res_values)
+        positions.append(block_rows)
+        values.append(block_values)
+
+    if not positions:
+        return pd.DataFrame(columns=df.columns)
+    return take_rows(df, np.concatenate(positions), np.concatenate(values), last_col_name)
@@ -0,0 +1,120 @@
+import numpy as np
+import pandas as pd
+
+from hierarchy_expand import iter_blocks
+from hierarchy_ranges import literal_values, parse_range
+
+ACCOUNT_PATTERN = r"^(?P<prefix>[A-Za-z]*)(?P<number>\d+)$"
+
+
+class AccountIndex:
+    """Map accounts to their hierarchy node straight from the Account_Range intervals.
+
+    Every leaf block contributes its ranges as (prefix, start, end) intervals that
+    point at the last row of the block, the deepest node the ranges are attached to.
+    Intervals are kept per prefix in arrays sorted on start, so a lookup is a
+    binary search instead of a scan of the expanded *_new file. Single values keep
+    the digit width of their text, so to_frame writes A000208 back as A000208.
+    """
+
+    def __init__(self, nodes, intervals, literals):
+        self.nodes = nodes
+        self.intervals = intervals
+        self.literals = literals
+
+    @classmethod
+    def from_frame(cls, df, keysn, last_col_name):
+        """Build the index from a prepared hierarchy frame and its keysn block boundaries."""
+        node_rows = []
+        segments = {}
+        literals = {}
+        segment_list = lambda text: list(parse_range(text))
+        for from_value, to_value, block_segments in iter_blocks(df, keysn, last_col_name, segment_list):
+            if to_value - 2 < from_value:
+                continue
+            node = len(node_rows)
+            node_rows.append(to_value - 2)
+            for segment in block_segments:
+                if segment.start >= 0:
+                    start, end = sorted((segment.start, segment.end))
+                    # Ranges are expanded without zero padding, single values as they are written
+                    width = 0 if segment.literal is None else len(segment.literal) - len(segment.prefix)
+                    segments.setdefault(segment.prefix, []).append((start, end, node, width))
+                else:
+                    # Not numeric, e.g. [ABC] or [Axx-Ayy]; matched on the exact text
+                    for part in literal_values(segment.literal):
+                        literals.setdefault(part, node)
+
+        intervals = {}
+        for prefix, entries in segments.items():
+            entries = np.array(sorted(entries), dtype="int64")
+            starts, ends, node, width = entries[:, 0], entries[:, 1], entries[:, 2], entries[:, 3]
+            intervals[prefix] = (starts, ends, np.maximum.accumulate(ends), node, width)
+
+        nodes = df.iloc[node_rows].drop(columns=[last_col_name]).reset_index(drop=True)
+        return cls(nodes, intervals, literals)
+
+    def _find(self, prefix, numbers):
+        """Return the node position for every number with the given prefix, -1 when no interval contains it."""
+        if prefix not in self.intervals:
+            return np.full(len(numbers), -1, dtype="int64")
+        starts, ends, max_ends, node, _ = self.intervals[prefix]
+        i = np.searchsorted(starts, numbers, side="right") - 1
+        candidate = np.maximum(i, 0)
+        found = (i >= 0) & (ends[candidate] >= numbers)
+        result = np.where(found, node[candidate], -1)
+
+        # With overlapping ranges an earlier interval can still contain the number
+        for j in np.flatnonzero(~found & (i >= 0) & (max_ends[candidate] >= numbers)):
+            k = i[j]
+            while k >= 0 and max_ends[k] >= numbers[j]:
+                if ends[k] >= numbers[j]:
+                    result[j] = node[k]
+                    break
+                k -= 1
+        return result
+
+    def lookup_many(self, accounts):
+        """Map a column of accounts to their node, one row per account (all NaN when not found)."""
+        text = pd.Series(accounts).reset_index(drop=True).astype("string").str.strip()
+        parts = text.str.extract(ACCOUNT_PATTERN)
+        numbers = pd.to_numeric(parts["number"])
+        result = np.full(len(text), -1, dtype="int64")
+
+        numeric = numbers.notna().to_numpy()
+        for prefix, positions in parts[numeric].groupby("prefix").groups.items():
+            positions = positions.to_numpy()
+            result[positions] = self._find(prefix, numbers.to_numpy()[positions].astype("int64"))
+
+        missing = np.flatnonzero(result < 0)
+        if self.literals and len(missing):
+            result[missing] = [self.literals.get(value, -1) for value in text.iloc[missing].fillna('')]
+
+        return self.nodes.reindex(result).reset_index(drop=True)
+
+    def lookup(self, account):
+        """Return the node of a single account as a dict, or None when it is not in any range."""
+        node = self.lookup_many([account]).iloc[0]
+        return None if node.isna().all() else node.to_dict()
+
+    def to_frame(self, account_col="account"):
+        """Materialize one row per account in the index, like the expanded *_new file."""
+        accounts = []
+        node_positions = []
+        for prefix, (starts, ends, _, node, width) in self.intervals.items():
+            lengths = ends - starts + 1
+            numbers = np.repeat(starts - np.cumsum(np.r_[0, lengths[:-1]]), lengths) + np.arange(lengths.sum())
+            digits = numbers.astype(str)
+            padding = np.maximum(np.repeat(width, lengths) - np.char.str_len(digits), 0)
+            digits = np.char.add(np.char.multiply("0", padding), digits)
+            accounts.append(np.char.add(prefix, digits).astype(object))
+            node_positions.append(np.repeat(node, lengths))
+        for literal, node in self.literals.items():
+            accounts.append(np.array([literal], dtype=object))
+            node_positions.append(np.array([node]))
+
+        if not accounts:
+            return self.nodes.iloc[:0].assign(**{account_col: []})
+        res = self.nodes.iloc[np.concatenate(node_positions)].reset_index(drop=True)
+        res.insert(0, account_col, np.concatenate(accounts))
+        return res
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+MAX_LEVEL = 13
+
+# "first" keeps the original fill_columns behaviour: a missing Level_i takes the first
+# non-null Level_i from the top of the file. "ancestor" takes the nearest Level_i above
+# that still belongs to the current branch, like a stack of open ancestors.
+FILL_MODES = ("first", "ancestor")
+
+
+def backfill_levels(df, first_level=1, fill_mode="first"):
+    """Fill missing Level_i values on rows with a Level_Nr, one vectorized pass per level column."""
+    if fill_mode not in FILL_MODES:
+        raise ValueError(f"Unknown fill mode {fill_mode}, expected one of {FILL_MODES}.")
+
+    has_level = df["Level_Nr"].notna().to_numpy()
+    level_nr = df["Level_Nr"].fillna(0).astype("int64").to_numpy()
+    positions = np.arange(len(df))
+
+    for i in range(first_level, MAX_LEVEL + 1):
+        col_name = f"Level_{i}"
+        if col_name not in df.columns:
+            break
+        in_level = has_level & (level_nr >= i)
+        isna = df[col_name].isna().to_numpy()
+        missing = in_level & isna
+        if not missing.any():
+            continue
+
+        if fill_mode == "first":
+            known = positions[~isna]
+            if len(known) == 0:
+                continue
+            source = np.where(positions > known[0], known[0], -1)
+        else:
+            # Rows that close the branch above level i reset the source to -1
+            reset = has_level & (level_nr < i)
+            source = np.where(in_level & ~isna, positions, np.where(reset, -1, np.nan))
+            source = pd.Series(source).ffill().fillna(-1).astype("int64").to_numpy()
+
+        fill = missing & (source >= 0)
+        if fill.any():
+            values = df[col_name].to_numpy()
+            df.loc[fill, col_name] = values[source[fill]]
+    return df
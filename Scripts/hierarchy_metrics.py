@@ -0,0 +1,44 @@
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+# Phases of calculate_hierarchy, in the order they run
+PHASES = ("read", "level_fill", "key_detection", "row_counting", "expansion", "write")
+
+
+class Metrics:
+    """Wall time per phase and counters for one or more hierarchy runs."""
+
+    def __init__(self):
+        self.spans = Counter()
+        self.counters = Counter()
+
+    @contextmanager
+    def span(self, name):
+        """Add the wall time of the with-block to the phase name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[name] += time.perf_counter() - start
+
+    def count(self, name, value=1):
+        self.counters[name] += value
+
+    def to_dict(self):
+        return {"spans": dict(self.spans), "counters": dict(self.counters)}
+
+    def merge(self, data):
+        """Add the spans and counters of a to_dict() result, e.g. from a worker process."""
+        self.spans.update(data["spans"])
+        self.counters.update(data["counters"])
+
+    def print_summary(self):
+        phases = [p for p in PHASES if p in self.spans] + [p for p in self.spans if p not in PHASES]
+        print(" | ".join(f"{p} {self.spans[p]:.2f}s" for p in phases))
+        print(" | ".join(f"{name} {value}" for name, value in self.counters.items()))
+
+    def write_json(self, path, **extra):
+        with open(path, "w") as f:
+            json.dump({**self.to_dict(), **extra}, f, indent=2)
@@ -0,0 +1,144 @@
+# Output formats for the expanded hierarchy files
+# pip install pyarrow  (only needed for parquet and arrow)
+import os
+
+import numpy as np
+import pandas as pd
+
+OUTPUT_FORMATS = ("csv", "parquet", "arrow")
+# Arrow is written in the IPC stream format, which allows a new dictionary per row group
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrows"}
+
+# Suffixes of the integer range columns in the columnar formats
+PREFIX_SUFFIX = "_prefix"
+NUMBER_SUFFIX = "_nr"
+
+
+def output_path(path, output_format):
+    """Replace the extension of path by the one of output_format."""
+    return os.path.splitext(path)[0] + EXTENSIONS[output_format]
+
+
+def split_range_values(values):
+    """Split expanded range values such as 'A286' into a prefix and an integer.
+
+    Returns (literal, prefix, number). Values that do not round-trip exactly as
+    prefix + str(number), e.g. 'B05' or 'ABC', are kept in literal and have no
+    prefix or number; literal is null for all other values.
+    """
+    values = pd.Series(values, dtype="string").reset_index(drop=True)
+    parts = values.str.extract(r"^(?P<prefix>[A-Za-z]*)(?P<number>\d+)$")
+    number = pd.to_numeric(parts["number"]).astype("Int64")
+    lossless = (parts["prefix"] + number.astype("string") == values).fillna(False)
+    return values.where(~lossless), parts["prefix"].where(lossless), number.where(lossless)
+
+
+def to_arrow_table(df, last_col_name):
+    """Convert an expanded hierarchy frame to an Arrow table for the columnar formats.
+
+    Text columns (Level_*, Node_Description, filename, ...) are dictionary-encoded and
+    the range column is stored as <col>_prefix and an integer <col>_nr, with <col> only
+    holding the values that cannot be rebuilt from them (see read_hierarchy).
+    """
+    import pyarrow as pa
+
+    columns = {}
+    for name in df.columns:
+        if name == last_col_name:
+            literal, prefix, number = split_range_values(df[name].to_numpy(dtype=object))
+            columns[name] = pa.array(literal, type=pa.string(), from_pandas=True)
+            columns[name + PREFIX_SUFFIX] = pa.array(prefix, type=pa.string(), from_pandas=True).dictionary_encode()
+            columns[name + NUMBER_SUFFIX] = pa.array(number, type=pa.int64(), from_pandas=True)
+        elif df[name].dtype == object or isinstance(df[name].dtype, pd.CategoricalDtype):
+            text = df[name].astype("string")
+            columns[name] = pa.array(text, type=pa.string(), from_pandas=True).dictionary_encode()
+        else:
+            columns[name] = pa.array(df[name], from_pandas=True)
+    return pa.table(columns)
+
+
+class HierarchyWriter:
+    """Write expanded hierarchy frames to CSV, Parquet or Arrow IPC, one chunk at a time."""
+
+    def __init__(self, path, output_format="csv", last_col_name="Account_Range", row_group_size=65536):
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format {output_format}, expected one of {OUTPUT_FORMATS}.")
+        self.path = path
+        self.output_format = output_format
+        self.last_col_name = last_col_name
+        self.row_group_size = row_group_size
+        self._file = None
+        self._writer = None
+        self._schema = None
+        # Small streamed chunks are buffered so the columnar files get full row groups
+        self._pending = []
+        self._pending_rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, df):
+        """Append df; the first call also writes the CSV header or fixes the columnar schema."""
+        if self.output_format == "csv":
+            header = self._file is None
+            if header:
+                self._file = open(self.path, "w", newline="")
+            df.to_csv(self._file, header=header, index=False)
+            return
+
+        table = to_arrow_table(df, self.last_col_name)
+        if self._writer is None:
+            import pyarrow.parquet as pq
+            import pyarrow as pa
+
+            self._schema = table.schema
+            if self.output_format == "parquet":
+                self._writer = pq.ParquetWriter(self.path, self._schema)
+            else:
+                options = pa.ipc.IpcWriteOptions(compression="zstd")
+                self._writer = pa.ipc.new_stream(self.path, self._schema, options=options)
+        self._pending.append(table.cast(self._schema))
+        self._pending_rows += len(table)
+        if self._pending_rows >= self.row_group_size:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+
+        if self._pending:
+            table = pa.concat_tables(self._pending).unify_dictionaries().combine_chunks()
+            self._writer.write_table(table, self.row_group_size)
+            self._pending = []
+            self._pending_rows = 0
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+
+def read_hierarchy(path, last_col_name="Account_Range"):
+    """Read a hierarchy file written by HierarchyWriter back into a DataFrame with the original range column."""
+    if path.endswith(EXTENSIONS["csv"]):
+        return pd.read_csv(path)
+    if path.endswith(EXTENSIONS["parquet"]):
+        df = pd.read_parquet(path)
+    else:
+        import pyarrow as pa
+
+        with pa.ipc.open_stream(path) as reader:
+            df = reader.read_all().to_pandas()
+
+    prefix_col, number_col = last_col_name + PREFIX_SUFFIX, last_col_name + NUMBER_SUFFIX
+    # _nr comes back as float64 when it has nulls (literal rows), Int64 keeps 288 from becoming "288.0"
+    rebuilt = df[prefix_col].astype("string") + df[number_col].astype("Int64").astype("string")
+    df[last_col_name] = df[last_col_name].astype("string").fillna(rebuilt).astype(object)
+    df[last_col_name] = df[last_col_name].where(df[last_col_name].notna(), np.nan)
+    return df.drop(columns=[prefix_col, number_col])
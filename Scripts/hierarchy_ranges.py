@@ -0,0 +1,89 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# One segment of a range string: "A01-A10", "123-456" or a single value such as "B05"
+SEGMENT_PATTERN = r"^(?P<prefix>[A-Za-z]*)(?P<start>\d+)(?:-(?P<end_prefix>[A-Za-z]*)(?P<end>\d+))?$"
+SEGMENT_RE = re.compile(SEGMENT_PATTERN)
+STRIP_RE = re.compile(r"[\[\]\s]")
+
+# literal is the segment text for single values and segments that are not a numeric
+# range (start and end are -1 when it could not be parsed); it is None for ranges.
+# count is the number of values the segment expands to, see literal_values.
+RangeSegment = namedtuple("RangeSegment", ["prefix", "start", "end", "literal", "count"])
+RangeArrays = namedtuple("RangeArrays", ["row", "prefix", "start", "end", "literal", "count"])
+
+
+def literal_values(literal):
+    """Return the values a segment that is not a numeric range expands to.
+
+    'X-Y' is not a range but keeps both ends, X and Y; other text such as 'ABC' or
+    'X-Y-Z' is one value. Empty ends, e.g. of 'A5-', are dropped.
+    """
+    parts = literal.split('-') if literal.count('-') == 1 else [literal]
+    return tuple(part for part in parts if part)
+
+
+def _parse_segment(segment):
+    """Parse one comma-separated segment into a RangeSegment."""
+    match = SEGMENT_RE.match(segment)
+    if match is None:
+        return RangeSegment('', -1, -1, segment, len(literal_values(segment)))
+
+    start = int(match.group("start"))
+    if match.group("end") is None:
+        return RangeSegment(match.group("prefix"), start, start, segment, 1)
+
+    end = int(match.group("end"))
+    # A prefix is only used when both ends carry one, e.g. A01-A10 but not A01-10
+    prefix = match.group("prefix") if match.group("prefix") and match.group("end_prefix") else ''
+    return RangeSegment(prefix, start, end, None, abs(end - start) + 1)
+
+
+@lru_cache(maxsize=65536)
+def parse_range(text):
+    """Parse a range string such as '[A01-A10,B05]' into a tuple of RangeSegments."""
+    if not isinstance(text, str):
+        return ()
+    return tuple(_parse_segment(segment) for segment in STRIP_RE.sub('', text).split(',') if segment)
+
+
+def count_range(text):
+    """Return the number of values a range string expands to."""
+    return sum(segment.count for segment in parse_range(text))
+
+
+def parse_range_column(values):
+    """Parse a whole Account_Range/BU_Range column at once.
+
+    Returns RangeArrays with one entry per segment; row holds the position of the
+    segment's source value, so a row with '[A01-A10,B05]' contributes two entries.
+    Null values contribute none. Per-row counts are np.bincount(row, count, len(values)).
+    """
+    values = pd.Series(values).reset_index(drop=True)
+    segments = (values.dropna().astype(str)
+                .str.replace(STRIP_RE.pattern, '', regex=True)
+                .str.split(',')
+                .explode())
+    segments = segments[segments.notna() & (segments != '')]
+
+    parts = segments.str.extract(SEGMENT_PATTERN)
+    numeric = parts["start"].notna().to_numpy()
+    is_range = numeric & parts["end"].notna().to_numpy()
+
+    start = np.where(numeric, pd.to_numeric(parts["start"]).fillna(-1), -1).astype("int64")
+    end = np.where(is_range, pd.to_numeric(parts["end"]).fillna(-1), start).astype("int64")
+    has_prefix = (parts["prefix"].fillna('') != '') & ((parts["end_prefix"].fillna('') != '') | ~is_range)
+    prefix = np.where(numeric & has_prefix.to_numpy(), parts["prefix"].fillna('').to_numpy(dtype=object), '')
+    literal = np.where(is_range, None, segments.to_numpy(dtype=object))
+    count = np.where(is_range, np.abs(end - start) + 1, 1)
+    # Malformed segments are counted like parse_range does
+    malformed = ~numeric
+    if malformed.any():
+        count[malformed] = segments[malformed].map(lambda text: len(literal_values(text))).to_numpy()
+
+    return RangeArrays(segments.index.to_numpy(dtype="int64"), prefix.astype(object), start, end,
+                       literal, count.astype("int64"))
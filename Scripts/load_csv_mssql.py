@@ -3,11 +3,37 @@
 # pip install pandas
 # pip install pyodbc
 
+import io
+import os
+import queue
+import threading
+import time
+from contextlib import closing, contextmanager
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import numpy as np
 import pandas as pd
-from azure.storage.blob import BlobServiceClient
-import pyodbc
 
-def load_csv_to_mssql(csv_file, connection_string, table_name):
+# Rows parsed and inserted at a time by the bulk loader
+CHUNK_SIZE = 50000
+
+# Suffixes of the tables used by if_exists='swap'
+STAGING_SUFFIX = "_staging"
+OLD_SUFFIX = "_old"
+
+# Read buffer of a streamed blob download
+STREAM_BUFFER_SIZE = 1024 * 1024
+
+# SQL Server column types per pandas dtype kind, text columns use text_type
+SQL_TYPES = {
+    "i": "BIGINT",
+    "u": "BIGINT",
+    "f": "FLOAT",
+    "b": "BIT",
+    "M": "DATETIME2",
+}
+
+def load_csv_to_mssql(csv_file, connection_string, table_name, chunk_size=CHUNK_SIZE):
     """
     Load a CSV file into a SQL Server database table.
 
@@ -15,22 +41,324 @@ def load_csv_to_mssql(csv_file, connection_string, table_name):
     csv_file (str): Path to the CSV file.
     connection_string (str): Connection string for the SQL Server database.
     table_name (str): Name of the table to load data into.
+    chunk_size (int): Number of rows read and inserted at a time.
 
     Returns:
-    None
+    dict: Rows loaded, seconds and rows per second, see bulk_load_csv.
     """
-    # Read the CSV file into a DataFrame
-    df = pd.read_csv(csv_file)
+    import pyodbc
 
     # Create a connection to the SQL Server database
     conn = pyodbc.connect(connection_string)
+    try:
+        # Load the CSV in chunks into the SQL Server table
+        return bulk_load_csv(csv_file, conn, table_name, chunk_size=chunk_size, if_exists='replace')
+    finally:
+        # Close the connection
+        conn.close()
+
+# A method to quote a table or column name, schema.table is quoted per part
+def quote_name(name):
+    return ".".join("[" + part.replace("]", "]]") + "]" for part in name.split("."))
+
+# A method to get the SQL type per column of a DataFrame, column_types overrides the types inferred from the dtypes
+def column_sql_types(df, text_type="NVARCHAR(MAX)", column_types=None):
+    column_types = column_types or {}
+    return {name: column_types.get(name, SQL_TYPES.get(dtype.kind, text_type)) for name, dtype in df.dtypes.items()}
+
+# A method to build the CREATE TABLE statement for the columns of a DataFrame
+def create_table_sql(df, table_name, text_type="NVARCHAR(MAX)", column_types=None):
+    types = column_sql_types(df, text_type, column_types)
+    columns = [f"{quote_name(str(name))} {sql_type}" for name, sql_type in types.items()]
+    return f"CREATE TABLE {quote_name(table_name)} ({', '.join(columns)})"
+
+# A method to check that a later chunk still fits the column types inferred from the first chunk
+# Numeric columns that changed dtype, e.g. integers that became float because of missing values, are cast back
+def match_column_types(chunk, types, table_name):
+    for name, sql_type in types.items():
+        column = chunk[name]
+        values = column.dropna()
+        if sql_type in ("BIGINT", "FLOAT"):
+            numbers = pd.to_numeric(values, errors="coerce")
+            bad = numbers.isna() | (numbers % 1 != 0) if sql_type == "BIGINT" else numbers.isna()
+            if not bad.any() and column.dtype.kind not in ("iu" if sql_type == "BIGINT" else "iuf"):
+                chunk[name] = pd.to_numeric(column).astype("Int64" if sql_type == "BIGINT" else "float64")
+        elif sql_type == "BIT":
+            bad = ~values.map(lambda value: isinstance(value, (bool, np.bool_)))
+        elif sql_type == "DATETIME2":
+            bad = ~values.map(lambda value: isinstance(value, (pd.Timestamp, np.datetime64)))
+        else:
+            continue
+        if bad.any():
+            raise ValueError(f"Column {name} of {table_name} was created as {sql_type} from the first chunk, "
+                             f"but a later chunk has {values[bad].iloc[0]!r}. "
+                             f"Pass column_types={{{str(name)!r}: ...}} or a read_csv dtype for it.")
+    return chunk
+
+# A method to convert a DataFrame to parameter tuples, with None for missing values
+def to_rows(df):
+    columns = []
+    for name, column in df.items():
+        if column.dtype.kind == "M":
+            # Drivers bind datetime.datetime, not pandas Timestamps; NaT becomes None
+            columns.append(column.to_numpy().astype("datetime64[us]").astype(object))
+        else:
+            columns.append(column.astype(object).where(column.notna(), None).to_numpy())
+    return list(zip(*columns))
+
+# A method to read CSV chunks on a background thread, so parsing overlaps with inserting
+def read_chunks_in_background(csv_file, chunk_size, prefetch=2, **read_csv_kwargs):
+    chunks = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Give up when the consumer stopped, instead of blocking on a full queue forever
+        while not stop.is_set():
+            try:
+                chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def produce():
+        try:
+            for chunk in pd.read_csv(csv_file, chunksize=chunk_size, **read_csv_kwargs):
+                put(chunk)
+                if stop.is_set():
+                    return
+            put(done)
+        except Exception as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, name="csv-reader", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = chunks.get()
+            if item is done:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+def bulk_load_csv(csv_file, conn, table_name, chunk_size=CHUNK_SIZE, if_exists='append',
+                  placeholder='?', text_type="NVARCHAR(MAX)", column_types=None, **read_csv_kwargs):
+    """
+    Bulk load a CSV file into a table through any DB-API connection.
+
+    The CSV is read in chunks of chunk_size rows on a background thread while the
+    previous chunk is inserted, see bulk_load_frames.
+
+    Parameters:
+    csv_file (str or file): Path or file object of the CSV file.
+    conn: Open DB-API connection, e.g. pyodbc or sqlite3.
+    table_name (str): Name of the table to load data into.
+    chunk_size (int): Number of rows read and inserted at a time.
+    if_exists (str): 'append', 'replace' or 'swap', see bulk_load_frames.
+    placeholder (str): Parameter marker of the driver, '?' for pyodbc and sqlite3.
+    text_type (str): Column type for text columns of a new table, e.g. 'TEXT' for SQLite.
+    column_types (dict): SQL type per column of a new table, see bulk_load_frames.
+    **read_csv_kwargs: Passed on to pd.read_csv.
+
+    Returns:
+    dict: Rows loaded, seconds and rows per second.
+    """
+    # Closing the reader stops its thread, also when the load fails and the exception outlives this call
+    with closing(read_chunks_in_background(csv_file, chunk_size, **read_csv_kwargs)) as chunks:
+        return bulk_load_frames(chunks, conn, table_name, if_exists, placeholder, text_type, column_types)
+
+def bulk_load_frames(chunks, conn, table_name, if_exists='append', placeholder='?', text_type="NVARCHAR(MAX)",
+                     column_types=None):
+    """
+    Bulk load DataFrame chunks into a table through any DB-API connection.
+
+    Every chunk is inserted with one executemany call. On pyodbc, fast_executemany
+    is switched on so every batch is sent as one array-bound round trip. The load is
+    committed once at the end and rolled back on errors.
+
+    With if_exists='swap' the rows go to <table>_staging first, which then replaces the
+    table in one short transaction, so readers never see an empty or partial table.
+
+    A new table gets its column types from the first chunk, unless column_types names
+    them. Later chunks are checked against those types before they are inserted; a
+    column that no longer fits, e.g. text in a BIGINT column, raises a ValueError and
+    the load is rolled back.
+
+    Parameters:
+    chunks (iterable): DataFrames with the same columns, e.g. from pd.read_csv(chunksize=...).
+    conn: Open DB-API connection, e.g. pyodbc or sqlite3.
+    table_name (str): Name of the table to load data into.
+    if_exists (str): 'append' to insert into the table, creating it when missing,
+        'replace' to drop and recreate it first, 'swap' to load a staging table and
+        switch it into place.
+    placeholder (str): Parameter marker of the driver, '?' for pyodbc and sqlite3.
+    text_type (str): Column type for text columns of a new table, e.g. 'TEXT' for SQLite.
+    column_types (dict): SQL type per column of a new table, e.g. {'account': 'NVARCHAR(20)'},
+        overriding the type inferred from the first chunk.
+
+    Returns:
+    dict: Rows loaded, seconds and rows per second.
+    """
+    if if_exists not in ('append', 'replace', 'swap'):
+        raise ValueError(f"if_exists must be 'append', 'replace' or 'swap', got {if_exists}.")
+    load_table = table_name + STAGING_SUFFIX if if_exists == 'swap' else table_name
+
+    start = time.perf_counter()
+    rows = 0
+    cursor = conn.cursor()
+    if hasattr(cursor, "fast_executemany"):
+        cursor.fast_executemany = True
+    try:
+        insert_sql = None
+        # Inferred column types of the table created here, an existing table is not checked
+        inferred_types = {}
+        for chunk in chunks:
+            if insert_sql is None:
+                if if_exists != 'append':
+                    cursor.execute(f"DROP TABLE IF EXISTS {quote_name(load_table)}")
+                if if_exists != 'append' or not table_exists(cursor, load_table):
+                    cursor.execute(create_table_sql(chunk, load_table, text_type, column_types))
+                    inferred_types = {name: sql_type for name, sql_type in column_sql_types(chunk, text_type).items()
+                                      if name not in (column_types or {})}
+                columns = ", ".join(quote_name(str(name)) for name in chunk.columns)
+                markers = ", ".join([placeholder] * len(chunk.columns))
+                insert_sql = f"INSERT INTO {quote_name(load_table)} ({columns}) VALUES ({markers})"
+
+            else:
+                chunk = match_column_types(chunk, inferred_types, table_name)
+
+            # pyodbc refuses executemany without parameters, e.g. for a CSV with only a header
+            if len(chunk):
+                cursor.executemany(insert_sql, to_rows(chunk))
+            rows += len(chunk)
+            elapsed = time.perf_counter() - start
+            print(f"{table_name}: {rows} rows, {rows / elapsed:.0f} rows/sec")
+        conn.commit()
+
+        if if_exists == 'swap' and insert_sql is not None:
+            swap_tables(cursor, load_table, table_name)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    seconds = time.perf_counter() - start
+    rows_per_sec = rows / seconds if seconds else 0.0
+    print(f"Loaded {rows} rows into {table_name} in {seconds:.2f}s ({rows_per_sec:.0f} rows/sec)")
+    return {"table": table_name, "rows": rows, "seconds": seconds, "rows_per_sec": rows_per_sec}
+
+# A method to check if a table exists, by selecting no rows from it
+def table_exists(cursor, table_name):
+    try:
+        cursor.execute(f"SELECT * FROM {quote_name(table_name)} WHERE 1 = 0")
+        cursor.fetchall()
+        return True
+    except Exception:
+        return False
+
+# A method to rename a table, with sp_rename on SQL Server and ALTER TABLE on SQLite
+def rename_table(cursor, table_name, new_name):
+    # The new name is never schema qualified, the table stays in its schema
+    new_name = new_name.split(".")[-1]
+    if type(cursor).__module__ == "sqlite3":
+        cursor.execute(f"ALTER TABLE {quote_name(table_name)} RENAME TO {quote_name(new_name)}")
+    else:
+        cursor.execute("EXEC sp_rename ?, ?", (table_name, new_name))
+
+# A method to replace table_name by staging_table, run inside the caller's transaction
+def swap_tables(cursor, staging_table, table_name):
+    # sqlite3 runs DDL in autocommit mode unless a transaction is open, so open one to make the swap atomic
+    if type(cursor).__module__ == "sqlite3" and not cursor.connection.in_transaction:
+        cursor.execute("BEGIN")
+    old_table = table_name + OLD_SUFFIX
+    exists = table_exists(cursor, table_name)
+    cursor.execute(f"DROP TABLE IF EXISTS {quote_name(old_table)}")
+    if exists:
+        rename_table(cursor, table_name, old_table)
+    rename_table(cursor, staging_table, table_name)
+    if exists:
+        cursor.execute(f"DROP TABLE {quote_name(old_table)}")
 
+class ConnectionPool:
+    """Fixed set of DB-API connections shared by the worker threads of load_csv_jobs.
 
-    # Load the DataFrame into the SQL Server table
-    df.to_sql(table_name, conn, if_exists='replace', index=False)
+    A connection is used by whichever thread borrows it and all are closed by the thread
+    calling close(), so sqlite3 connections need check_same_thread=False.
+    """
+
+    def __init__(self, connect, size):
+        self._connect = connect
+        self._idle = queue.LifoQueue()
+        self._all = []
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(size)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, opening a new one only when none is idle."""
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+                with self._lock:
+                    self._all.append(conn)
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+
+    def close(self):
+        """Close all connections; a connection that fails to close is reported and skipped."""
+        with self._lock:
+            for conn in self._all:
+                try:
+                    conn.close()
+                except Exception as e:
+                    print(f"Failed to close connection: {e}")
+            self._all = []
+        self._idle = queue.LifoQueue()
+
+def load_csv_jobs(jobs, connect, max_workers=4, if_exists='swap', **bulk_load_kwargs):
+    """
+    Load many CSV files into their tables in parallel over a pool of connections.
+
+    Parameters:
+    jobs (list): (csv_file, table_name) pairs.
+    connect (callable): Returns a new DB-API connection, e.g. functools.partial(pyodbc.connect, connection_string).
+        Connections move between threads, for sqlite3 use check_same_thread=False.
+    max_workers (int): Number of tables loaded at the same time, also the number of connections.
+    if_exists (str): Load mode of every job, see bulk_load_csv; 'swap' by default.
+    **bulk_load_kwargs: Passed on to bulk_load_csv.
+
+    Returns:
+    list: bulk_load_csv result per job in the order of jobs; failed jobs have their exception.
+    """
+    pool = ConnectionPool(connect, max_workers)
 
-    # Close the connection
-    conn.close()
+    def run(csv_file, table_name):
+        with pool.connection() as conn:
+            return bulk_load_csv(csv_file, conn, table_name, if_exists=if_exists, **bulk_load_kwargs)
+
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(run, csv_file, table_name) for csv_file, table_name in jobs]
+            for (csv_file, table_name), future in zip(jobs, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"Failed to load {csv_file} into {table_name}: {e}")
+                    results.append(e)
+    finally:
+        pool.close()
+    return results
 
 # A method to read the csv files an Azure Storage Location 
 def read_csv_from_azure(azure_path):
@@ -50,23 +378,149 @@ def read_csv_from_azure(azure_path):
 
 # A method to list all CSV files on a Azure Storage Location using azure.storage.blob.BlobServiceClient
 
-def list_csv_files_in_azure_storage(container_name, connection_string):
+def list_csv_files_in_azure_storage(container_name, connection_string, prefix=None):
     """
     List all CSV files in an Azure Storage container.
 
     Parameters:
     container_name (str): Name of the Azure Storage container.
     connection_string (str): Connection string for the Azure Storage account.
+    prefix (str): Only list blobs whose name starts with prefix, filtered by the service.
 
     Returns:
     list: List of CSV file names in the specified container.
     """
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-    container_client = blob_service_client.get_container_client(container_name)
+    return list(AzureBlobStorage(container_name, connection_string).list_csv_files(prefix))
+
+class ChunkStream(io.RawIOBase):
+    """Read-only file object over an iterator of byte chunks, e.g. a blob download."""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = b""
+        self._offset = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while self._offset >= len(self._chunk):
+            self._chunk = next(self._chunks, None)
+            self._offset = 0
+            if self._chunk is None:
+                self._chunk = b""
+                return 0
+        size = min(len(buffer), len(self._chunk) - self._offset)
+        buffer[:size] = self._chunk[self._offset:self._offset + size]
+        self._offset += size
+        return size
+
+class LocalStorage:
+    """Storage layer over a local directory, a stand-in for a blob container in tests."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def list_csv_files(self, prefix=None):
+        """Yield the CSV files below the directory as '/'-separated names, like blob names."""
+        for root, _, files in sorted(os.walk(self.directory)):
+            for file in sorted(files):
+                name = os.path.relpath(os.path.join(root, file), self.directory).replace(os.sep, "/")
+                if name.endswith('.csv') and name.startswith(prefix or ""):
+                    yield name
+
+    def open(self, name):
+        return open(os.path.join(self.directory, name), "rb")
+
+class AzureBlobStorage:
+    """Storage layer over an Azure Storage container, also works against Azurite."""
+
+    def __init__(self, container_name, connection_string, results_per_page=5000, max_concurrency=1):
+        from azure.storage.blob import BlobServiceClient
+
+        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+        self.container_client = blob_service_client.get_container_client(container_name)
+        self.results_per_page = results_per_page
+        self.max_concurrency = max_concurrency
+
+    def list_csv_files(self, prefix=None):
+        """Yield the CSV blob names, one page at a time, filtered on prefix by the service."""
+        blobs = self.container_client.list_blobs(name_starts_with=prefix, results_per_page=self.results_per_page)
+        for page in blobs.by_page():
+            for blob in page:
+                if blob.name.endswith('.csv'):
+                    yield blob.name
+
+    def open(self, name):
+        """Return a file object that streams the blob, without a temporary file."""
+        downloader = self.container_client.download_blob(name, max_concurrency=self.max_concurrency)
+        return io.BufferedReader(ChunkStream(downloader.chunks()), buffer_size=STREAM_BUFFER_SIZE)
+
+def ingest_csv_files(storage, handler, prefix=None, max_workers=8):
+    """
+    Stream every CSV file of a storage layer through handler, max_workers files at a time.
 
-    csv_files = []
-    for blob in container_client.list_blobs():
-        if blob.name.endswith('.csv'):
-            csv_files.append(blob.name)
+    Files are listed lazily, so at most twice max_workers files are queued at any time
+    even for containers with many pages of blobs.
+
+    Parameters:
+    storage: LocalStorage, AzureBlobStorage or any object with list_csv_files(prefix) and open(name).
+    handler (callable): Called as handler(name, stream) for every file, e.g. read_csv_handler.
+    prefix (str): Only process files whose name starts with prefix.
+    max_workers (int): Number of files downloaded and handled concurrently.
+
+    Returns:
+    dict: Result of handler per file name; files that failed map to their exception.
+    """
+    def handle(name):
+        with storage.open(name) as stream:
+            return handler(name, stream)
 
-    return csv_files
+    results = {}
+    pending = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for name in storage.list_csv_files(prefix):
+            if len(pending) >= 2 * max_workers:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                collect_results(done, pending, results)
+            pending[executor.submit(handle, name)] = name
+        collect_results(pending, pending, results)
+    return results
+
+# A method to move finished futures from pending to results
+def collect_results(futures, pending, results):
+    for future in list(futures):
+        name = pending.pop(future)
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            print(f"Failed to ingest {name}: {e}")
+            results[name] = e
+
+# A method to parse a streamed CSV file into a DataFrame
+def read_csv_handler(name, stream):
+    return pd.read_csv(stream)
+
+# A method to derive a table name from a file name, e.g. 2024/01/sales.csv -> sales
+def table_name_from_file(name):
+    return os.path.splitext(os.path.basename(name))[0]
+
+def bulk_load_handler(connect, table_name=table_name_from_file, **bulk_load_kwargs):
+    """
+    Return a handler for ingest_csv_files that bulk loads every file with its own connection.
+
+    Parameters:
+    connect (callable): Returns a new DB-API connection, e.g. functools.partial(pyodbc.connect, connection_string).
+    table_name (callable): Maps a file name to its table name.
+    **bulk_load_kwargs: Passed on to bulk_load_csv.
+
+    Returns:
+    callable: Handler returning the bulk_load_csv result of a file.
+    """
+    def handler(name, stream):
+        conn = connect()
+        try:
+            return bulk_load_csv(stream, conn, table_name(name), **bulk_load_kwargs)
+        finally:
+            conn.close()
+    return handler
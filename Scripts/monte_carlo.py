@@ -1,36 +1,244 @@
-import random
+# pip install scipy  (only needed for sobol and halton sampling)
 import math
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
 
-def monte_carlo_pi(num_samples):
+import numpy as np
+
+# Points drawn per batch, keeps memory at a few tens of MB whatever the sample count
+CHUNK_SIZE = 1_000_000
+
+# Sampling methods of monte_carlo
+SAMPLING = ("random", "antithetic", "sobol", "halton")
+
+# Number of independently scrambled sequences used to estimate the error of sobol and halton
+QMC_REPLICATES = 16
+
+MonteCarloResult = namedtuple("MonteCarloResult", ["estimate", "stderr", "samples", "seconds", "samples_per_sec"])
+
+def count_inside_circle(num_samples, seed_sequence, chunk_size=CHUNK_SIZE):
     """
-    Estimate the value of π using Monte Carlo simulation.
+    Count the random points of the unit square that lie inside the unit circle.
 
     Args:
         num_samples (int): Number of random points to generate.
+        seed_sequence (np.random.SeedSequence): Seed of this worker's random stream.
+        chunk_size (int): Number of points generated at a time.
 
     Returns:
-        float: Estimated value of π.
+        int: Number of points inside the circle.
     """
+    rng = np.random.default_rng(seed_sequence)
     inside_circle = 0
+    remaining = num_samples
+    while remaining > 0:
+        size = min(chunk_size, remaining)
+        # Generate random (x, y) points in the range [0, 1)
+        x = rng.random(size)
+        y = rng.random(size)
+
+        # Compare squared distances, no square root needed for x² + y² <= 1
+        inside_circle += int(np.count_nonzero(x * x + y * y <= 1))
+        remaining -= size
+    return inside_circle
+
+def estimate_pi(num_samples, workers=None, seed=None, chunk_size=CHUNK_SIZE):
+    """
+    Estimate the value of π using Monte Carlo simulation on a process pool.
+
+    The samples are split evenly over the workers, each with its own stream spawned
+    from one np.random.SeedSequence, so the same seed and workers give the same estimate.
 
-    for _ in range(num_samples):
-        # Generate random (x, y) point in the range [0, 1]
-        x = random.uniform(0, 1)
-        y = random.uniform(0, 1)
+    Args:
+        num_samples (int): Number of random points to generate.
+        workers (int): Number of processes, defaults to the number of CPUs.
+        seed (int): Seed for reproducible results, None for a random one.
+        chunk_size (int): Number of points generated at a time per worker.
+
+    Returns:
+        MonteCarloResult: Estimate, its standard error, samples, seconds and samples per second.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, num_samples))
+    seed_sequences = np.random.SeedSequence(seed).spawn(workers)
+    per_worker, extra = divmod(num_samples, workers)
+    sample_counts = [per_worker + (i < extra) for i in range(workers)]
 
-        # Check if the point lies inside the unit circle
-        if math.sqrt(x**2 + y**2) <= 1:
-            inside_circle += 1
+    start = time.perf_counter()
+    if workers == 1:
+        inside_circle = count_inside_circle(num_samples, seed_sequences[0], chunk_size)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            inside_circle = sum(executor.map(count_inside_circle, sample_counts, seed_sequences,
+                                             [chunk_size] * workers))
+    seconds = time.perf_counter() - start
 
     # π is approximately 4 times the ratio of points inside the circle to total points
-    return 4 * (inside_circle / num_samples)
+    ratio = inside_circle / num_samples
+    stderr = 4 * math.sqrt(ratio * (1 - ratio) / num_samples)
+    return MonteCarloResult(4 * ratio, stderr, num_samples, seconds, num_samples / seconds if seconds else float("inf"))
+
+class RunningStats:
+    """Count, mean and sum of squared deviations, updated one batch at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        # Combine the batch statistics with the running ones (Chan et al.), stable for large counts
+        count = len(values)
+        if count == 0:
+            return
+        mean = float(np.mean(values))
+        m2 = float(np.sum((values - mean) ** 2))
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.count = total
+
+    @property
+    def stderr(self):
+        if self.count < 2:
+            return math.inf
+        return math.sqrt(self.m2 / (self.count - 1) / self.count)
+
+def qmc_engines(sampling, dim, seed_sequences):
+    """Return one scrambled scipy Sobol or Halton engine per seed sequence."""
+    from scipy.stats import qmc
+
+    engine = qmc.Sobol if sampling == "sobol" else qmc.Halton
+    return [engine(dim, scramble=True, seed=np.random.default_rng(s)) for s in seed_sequences]
+
+def monte_carlo(integrand, dim, target_stderr=None, target_ci=None, confidence=0.95, sampling="random",
+                batch_size=65536, min_samples=10_000, max_samples=100_000_000, seed=None):
+    """
+    Estimate the mean of a vectorized integrand over the unit cube, stopping at a target precision.
+
+    The integrand gets an (n, dim) array of points in [0, 1) and returns n values. Batches
+    are drawn until the standard error is at most target_stderr, or the confidence interval
+    half-width is at most target_ci, or max_samples is reached.
+
+    Sampling:
+        random: independent uniform points.
+        antithetic: every point u is paired with 1 - u, the pair mean is one sample.
+        sobol, halton: QMC_REPLICATES randomly scrambled quasi-random sequences, the
+            error is estimated from the spread of their means. Batches of sobol are
+            rounded up to a power of 2 to keep its balance properties.
+
+    The last batch is shrunk so no more than max_samples evaluations are made; antithetic
+    and sobol can stop up to a pair or a few points per sequence below it.
+
+    Args:
+        integrand (callable): Vectorized function of an (n, dim) array returning n values.
+        dim (int): Number of dimensions of the points.
+        target_stderr (float): Stop when the standard error is at most this value.
+        target_ci (float): Stop when the confidence interval half-width is at most this value.
+        confidence (float): Confidence level of target_ci.
+        sampling (str): One of SAMPLING.
+        batch_size (int): Number of integrand evaluations per batch, rounded up to an even number for antithetic.
+        min_samples (int): Do not stop before this many evaluations.
+        max_samples (int): Stop after this many evaluations even if the target is not met.
+        seed (int): Seed for reproducible results, None for a random one.
+
+    Returns:
+        MonteCarloResult: Estimate, its standard error, evaluations, seconds and evaluations per second.
+    """
+    if sampling not in SAMPLING:
+        raise ValueError(f"Unknown sampling {sampling}, expected one of {SAMPLING}.")
+    if batch_size < 1:
+        raise ValueError(f"batch_size must be at least 1, got {batch_size}.")
+    # Smallest number of evaluations of one batch: a pair, or one point per scrambled sequence
+    min_batch = {"random": 1, "antithetic": 2}.get(sampling, QMC_REPLICATES)
+    if max_samples < min_batch:
+        raise ValueError(f"max_samples must be at least {min_batch} for {sampling} sampling, got {max_samples}.")
+    if sampling == "antithetic":
+        batch_size = max(2, batch_size + batch_size % 2)
+    if target_ci is not None:
+        z = NormalDist().inv_cdf((1 + confidence) / 2)
+        target_stderr = min(target_stderr or math.inf, target_ci / z)
+    target_stderr = target_stderr or 0.0
+
+    start = time.perf_counter()
+    samples = 0
+    if sampling in ("random", "antithetic"):
+        rng = np.random.default_rng(seed)
+        stats = RunningStats()
+        while True:
+            size = min(batch_size, max_samples - samples)
+            if sampling == "random":
+                values = integrand(rng.random((size, dim)))
+            else:
+                points = rng.random((size // 2, dim))
+                values = (integrand(points) + integrand(1 - points)) / 2
+            stats.update(np.asarray(values, dtype=float))
+            samples += size if sampling == "random" else 2 * len(values)
+            estimate, stderr = stats.mean, stats.stderr
+            if (samples >= min_samples and stderr <= target_stderr) or max_samples - samples < min_batch:
+                break
+    else:
+        seed_sequences = np.random.SeedSequence(seed).spawn(QMC_REPLICATES)
+        engines = qmc_engines(sampling, dim, seed_sequences)
+        per_replicate = max(1, batch_size // QMC_REPLICATES)
+        if sampling == "sobol":
+            per_replicate = 1 << (per_replicate - 1).bit_length()
+        sums = np.zeros(QMC_REPLICATES)
+        counts = 0
+        while True:
+            size = min(per_replicate, (max_samples - samples) // QMC_REPLICATES)
+            if sampling == "sobol":
+                # A smaller last batch stays a power of 2
+                size = 1 << (size.bit_length() - 1)
+            for i, engine in enumerate(engines):
+                sums[i] += float(np.sum(integrand(engine.random(size))))
+            counts += size
+            samples += size * QMC_REPLICATES
+            means = sums / counts
+            estimate = float(np.mean(means))
+            stderr = float(np.std(means, ddof=1) / math.sqrt(QMC_REPLICATES))
+            if (samples >= min_samples and stderr <= target_stderr) or max_samples - samples < min_batch:
+                break
+
+    seconds = time.perf_counter() - start
+    return MonteCarloResult(estimate, stderr, samples, seconds, samples / seconds if seconds else float("inf"))
+
+def pi_integrand(points):
+    """4 inside the quarter unit circle and 0 outside, its mean over the unit square is π."""
+    return 4.0 * (np.sum(points * points, axis=1) <= 1)
+
+def monte_carlo_pi(num_samples, workers=1, seed=None, target_stderr=None, sampling="random"):
+    """
+    Estimate the value of π using Monte Carlo simulation.
+
+    Args:
+        num_samples (int): Number of random points to generate, the maximum when target_stderr is given.
+        workers (int): Number of processes, see estimate_pi. Only for plain random sampling
+            without target_stderr; monte_carlo runs in one process.
+        seed (int): Seed for reproducible results, None for a random one.
+        target_stderr (float): Stop as soon as the standard error is at most this value, see monte_carlo.
+        sampling (str): One of SAMPLING; other than "random" runs through monte_carlo.
+
+    Returns:
+        float: Estimated value of π.
+    """
+    if target_stderr is not None or sampling != "random":
+        if workers is not None and workers > 1:
+            raise ValueError("workers is only supported for random sampling without target_stderr.")
+        return monte_carlo(pi_integrand, 2, target_stderr=target_stderr, sampling=sampling,
+                           max_samples=num_samples, seed=seed).estimate
+    return estimate_pi(num_samples, workers, seed).estimate
 
 if __name__ == "__main__":
     # Number of random samples
     num_samples = 1_000_000_000
 
-    # Estimate π
-    estimated_pi = monte_carlo_pi(num_samples)
+    # Estimate π on all cores
+    result = estimate_pi(num_samples)
 
     # Display the result
-    print(f"Estimated value of π using {num_samples} samples: {estimated_pi}")
+    print(f"Estimated value of π using {num_samples} samples: {result.estimate} ± {result.stderr:.2e}")
+    print(f"{result.samples_per_sec:,.0f} samples/sec in {result.seconds:.1f}s")
@@ -1,30 +1,105 @@
+# Calendar dimension for Power BI
+# python powerbi_calendar.py --start 2020-01-01 --end 2030-12-31 --fiscal-start-month 7 --output calendar.csv
+# python powerbi_calendar.py --start 1900-01-01 --end 2099-12-31 --freq h --locale nl_NL.UTF-8 --output calendar.parquet
+import argparse
+
+import numpy as np
 import pandas as pd
 
-# Define start and end dates for the calendar
-start_date = "2020-01-01"
-end_date = "2030-12-31"
-
-# Generate date range
-dates = pd.date_range(start=start_date, end=end_date, freq="D")
-
-# Create dataframe
-calendar_df = pd.DataFrame({"Date": dates})
-
-# Add useful columns
-calendar_df["Year"] = calendar_df["Date"].dt.year
-calendar_df["Month"] = calendar_df["Date"].dt.month
-calendar_df["MonthName"] = calendar_df["Date"].dt.strftime("%B")
-calendar_df["Quarter"] = calendar_df["Date"].dt.quarter
-calendar_df["DayOfWeek"] = calendar_df["Date"].dt.weekday + 1  # Monday=1
-calendar_df["DayName"] = calendar_df["Date"].dt.strftime("%A")
-calendar_df["WeekOfYear"] = calendar_df["Date"].dt.isocalendar().week
-calendar_df["IsWeekend"] = calendar_df["DayOfWeek"].isin([6, 7])
-
-# Fiscal year example (starts in July)
-calendar_df["FiscalYear"] = calendar_df["Date"].apply(
-    lambda d: d.year + 1 if d.month >= 7 else d.year
-)
-calendar_df["FiscalQuarter"] = ((calendar_df["Date"].dt.month - 7) % 12) // 3 + 1
-
-# Show the first few rows
-print(calendar_df.head())
\ No newline at end of file
+# Rows per insert batch when the calendar is bulk loaded
+LOAD_CHUNK_SIZE = 100000
+
+# A method to get the month and day names in a locale, the locale must be installed on the machine
+def calendar_names(locale=None):
+    months = pd.date_range("2001-01-01", periods=12, freq="MS").month_name(locale=locale)
+    # 2001-01-01 is a Monday
+    days = pd.date_range("2001-01-01", periods=7, freq="D").day_name(locale=locale)
+    return list(months), list(days)
+
+def generate_calendar(start_date="2020-01-01", end_date="2030-12-31", freq="D", fiscal_start_month=7, locale=None):
+    """
+    Generate a calendar dimension table.
+
+    All columns are computed on whole arrays; MonthName and DayName are categoricals
+    built from 12 and 7 names instead of formatting every date.
+
+    Parameters:
+    start_date (str): First date of the calendar.
+    end_date (str): Last date of the calendar.
+    freq (str): Grain of the calendar, "D" for days or e.g. "h" for hours (adds an Hour column).
+    fiscal_start_month (int): First month of the fiscal year, 7 for a year starting in July.
+        The fiscal year is named after the calendar year it ends in.
+    locale (str): Locale of the month and day names, e.g. "nl_NL.UTF-8"; None for English.
+
+    Returns:
+    pd.DataFrame: One row per date (or hour) with the calendar columns.
+    """
+    if not 1 <= fiscal_start_month <= 12:
+        raise ValueError(f"Fiscal start month must be between 1 and 12, got {fiscal_start_month}.")
+
+    # Generate date range
+    dates = pd.date_range(start=start_date, end=end_date, freq=freq)
+    month_names, day_names = calendar_names(locale)
+
+    year = dates.year.to_numpy(dtype=np.int16)
+    month = dates.month.to_numpy(dtype=np.int8)
+    weekday = dates.weekday.to_numpy(dtype=np.int8)
+
+    # Create dataframe with useful columns
+    calendar_df = pd.DataFrame({"Date": dates})
+    if (dates.normalize() != dates).any():
+        calendar_df["Hour"] = dates.hour.to_numpy(dtype=np.int8)
+    calendar_df["Year"] = year
+    calendar_df["Month"] = month
+    calendar_df["MonthName"] = pd.Categorical.from_codes(month - 1, categories=month_names, ordered=True)
+    calendar_df["Quarter"] = dates.quarter.to_numpy(dtype=np.int8)
+    calendar_df["DayOfWeek"] = weekday + 1  # Monday=1
+    calendar_df["DayName"] = pd.Categorical.from_codes(weekday, categories=day_names, ordered=True)
+    calendar_df["WeekOfYear"] = dates.isocalendar().week.to_numpy(dtype=np.int8)
+    calendar_df["IsWeekend"] = weekday >= 5
+
+    # Fiscal year, e.g. July 2024 - June 2025 is fiscal year 2025 when it starts in July
+    calendar_df["FiscalYear"] = year + (month >= fiscal_start_month) if fiscal_start_month > 1 else year
+    calendar_df["FiscalQuarter"] = ((month - fiscal_start_month) % 12) // 3 + 1
+    return calendar_df
+
+def save_calendar(calendar_df, output):
+    """Write the calendar to a CSV file, or to Parquet when output ends with .parquet."""
+    if output.endswith(".parquet"):
+        calendar_df.to_parquet(output, index=False)
+    else:
+        calendar_df.to_csv(output, index=False)
+    print(f"Calendar with {len(calendar_df)} rows saved to {output}")
+
+def load_calendar(calendar_df, connection_string, table_name, if_exists="swap"):
+    """Bulk load the calendar into a SQL Server table, see load_csv_mssql.bulk_load_frames."""
+    import pyodbc
+    from load_csv_mssql import bulk_load_frames
+
+    chunks = (calendar_df.iloc[i:i + LOAD_CHUNK_SIZE] for i in range(0, len(calendar_df), LOAD_CHUNK_SIZE))
+    conn = pyodbc.connect(connection_string)
+    try:
+        return bulk_load_frames(chunks, conn, table_name, if_exists)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a calendar dimension table.")
+    parser.add_argument("--start", default="2020-01-01", help="First date of the calendar.")
+    parser.add_argument("--end", default="2030-12-31", help="Last date of the calendar.")
+    parser.add_argument("--freq", default="D", help="Grain of the calendar, D for days, h for hours.")
+    parser.add_argument("--fiscal-start-month", type=int, default=7)
+    parser.add_argument("--locale", help="Locale of the month and day names, e.g. nl_NL.UTF-8.")
+    parser.add_argument("--output", help="CSV or .parquet file to write the calendar to.")
+    parser.add_argument("--connection-string", help="SQL Server connection string to bulk load the calendar.")
+    parser.add_argument("--table", default="dbo.Calendar", help="Table to bulk load the calendar into.")
+    args = parser.parse_args()
+
+    calendar_df = generate_calendar(args.start, args.end, args.freq, args.fiscal_start_month, args.locale)
+    if args.output:
+        save_calendar(calendar_df, args.output)
+    if args.connection_string:
+        load_calendar(calendar_df, args.connection_string, args.table)
+    if not args.output and not args.connection_string:
+        # Show the first few rows
+        print(calendar_df.head())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The hierarchy scripts import their sibling modules directly
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
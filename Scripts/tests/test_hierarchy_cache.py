@@ -0,0 +1,35 @@
+import transform_hierarchy_accounts as tha
+from benchmark_hierarchy import generate_ps_tree
+
+PATTERN = "*PS_TREE.csv"
+
+
+def run(directory, **options):
+    (result,) = tha.list_csv_last_parts(str(directory), patterns=[PATTERN], **options)
+    return result
+
+
+def test_same_options_hit_the_cache(tmp_path):
+    generate_ps_tree(str(tmp_path / "PS_TREE.csv"), depth=3, fan_out=3)
+    assert not run(tmp_path).get("cached")
+    assert run(tmp_path).get("cached")
+
+
+def test_different_options_miss_the_cache(tmp_path):
+    generate_ps_tree(str(tmp_path / "PS_TREE.csv"), depth=3, fan_out=3)
+    run(tmp_path)
+    assert not run(tmp_path, streaming=True).get("cached")
+    assert run(tmp_path, streaming=True).get("cached")
+    assert not run(tmp_path, streaming=True, fill_mode="ancestor").get("cached")
+    assert not run(tmp_path, streaming=True, fill_mode="ancestor", output_format="parquet").get("cached")
+    assert not run(tmp_path, streaming=True, fill_mode="ancestor", force=True).get("cached")
+
+
+def test_streaming_is_not_served_from_a_capped_run(tmp_path):
+    # Ranges above max_range_size are only expanded in streaming mode
+    generate_ps_tree(str(tmp_path / "PS_TREE.csv"), depth=2, fan_out=2, range_width=3 * tha.max_range_size,
+                     single_probability=0)
+    capped = run(tmp_path)
+    streamed = run(tmp_path, streaming=True)
+    assert not streamed.get("cached")
+    assert streamed["rows_out"] > capped["rows_out"]
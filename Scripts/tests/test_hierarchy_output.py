@@ -0,0 +1,26 @@
+import pytest
+
+import transform_hierarchy_accounts as tha
+from benchmark_hierarchy import generate_ps_tree
+from hierarchy_output import read_hierarchy
+
+pytest.importorskip("pyarrow")
+
+
+@pytest.mark.parametrize("output_format", ["parquet", "arrow"])
+def test_columnar_round_trip_matches_csv(tmp_path, output_format):
+    # single_probability adds literal rows, so the integer range column has nulls
+    path = tmp_path / "PS_TREE.csv"
+    generate_ps_tree(str(path), depth=4, fan_out=3, single_probability=0.5)
+    with open(path, "a") as f:
+        f.write("," * 16 + '"[A000288,XYZ]"\n')
+
+    tha.calculate_hierarchy(str(path), tha.last_col_name)
+    tha.calculate_hierarchy(str(path), tha.last_col_name, output_format=output_format)
+    expected = read_hierarchy(tha.new_output_path(str(path)))
+    actual = read_hierarchy(tha.new_output_path(str(path), output_format))
+
+    assert actual[tha.last_col_name].tolist() == expected[tha.last_col_name].astype(str).tolist()
+    assert "A000288" in set(actual[tha.last_col_name])
+    assert not actual[tha.last_col_name].str.endswith(".0").any()
+    assert len(actual) == len(expected)
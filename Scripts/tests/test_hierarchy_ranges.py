@@ -0,0 +1,30 @@
+import pandas as pd
+import pytest
+
+import transform_hierarchy_accounts as tha
+from hierarchy_ranges import count_range, literal_values, parse_range, parse_range_column
+
+MALFORMED = ["[X-Y]", "[]", "[ ]", "[,]", "[A5-]", "[-]", "[X-Y-Z]", "[ABC]", "[A01-A03,X-Y]", "[A000208,,B1-B2]"]
+
+
+@pytest.mark.parametrize("text", MALFORMED)
+def test_count_matches_expansion(text):
+    values = tha.get_range(text)
+    assert count_range(text) == len(values)
+    assert sum(segment.count for segment in parse_range(text)) == len(values)
+    assert parse_range_column(pd.Series([text])).count.sum() == len(values)
+
+
+def test_literal_values():
+    assert literal_values("X-Y") == ("X", "Y")
+    assert literal_values("X-Y-Z") == ("X-Y-Z",)
+    assert literal_values("A5-") == ("A5",)
+    assert literal_values("-") == ()
+
+
+def test_parse_range_column_matches_parse_range():
+    values = pd.Series(MALFORMED + [None, "[A01-A10,B05]"])
+    ranges = parse_range_column(values)
+    for row, text in enumerate(values):
+        segments = parse_range(text)
+        assert [int(c) for c in ranges.count[ranges.row == row]] == [s.count for s in segments]
@@ -1,19 +1,29 @@
 import time
 import os
-import re
+import argparse
+import fnmatch
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import pandas as pd
 import numpy as np
 import logging 
+from hierarchy_expand import expand_block, expand_blocks, find_keys, iter_expanded_chunks
+from hierarchy_levels import FILL_MODES, backfill_levels
+from hierarchy_cache import HierarchyCache, file_hash
+from hierarchy_index import AccountIndex
+from hierarchy_metrics import Metrics
+from hierarchy_output import OUTPUT_FORMATS, HierarchyWriter, output_path
+from hierarchy_ranges import count_range, literal_values, parse_range, parse_range_column
 
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 # Enable future behavior for silent downcasting
 pd.set_option('future.no_silent_downcasting', True)
 
-logger.info("Creating hierarchy files...")
-
 last_col_name = 'Account_Range'
+default_pattern = '*PS_TREE_ACCOUNT_AC_RAP_ACC_AEGONNL_AEGON_01_01_2015.csv'
+# Largest range expanded in memory; streaming mode lifts it (max_size=None)
+max_range_size = 10000
 
 def get_filenames(file_path):
     """Generate a new filename by appending '_new' before the file extension."""
@@ -25,24 +35,16 @@ def get_filenames(file_path):
 
 # create a new df with same columns as df
 def apply_results(res_values, from_value, to_value, df):
-    # if to_value - from_value < 20000 then log error and return empty dataframe
-    if abs(to_value - from_value) > 20000:
-        logging.error(f"Range too large from {from_value} to {to_value}.")
-        return pd.DataFrame(columns=df.columns)
-
-    res = pd.DataFrame(columns=df.columns)
-    for i in range(from_value, to_value-1):
-        for val in res_values:
-            new_row = df.iloc[i].copy()
-            new_row[last_col_name] = val
-            res = pd.concat([res, new_row.to_frame().T], ignore_index=True)
-    return res
-
-
-def get_prefixed_range(from_int, to_int, prefix):
-    logging.info(f"Getting {to_int-from_int} elements. prefixed range {from_int} to {to_int} prefix:{prefix}.")
-    
-    if abs(from_int - to_int) > 10000:
+    """Repeat rows from_value..to_value-2 once per range value, replacing the last column."""
+    return expand_block(df, from_value, to_value, res_values, last_col_name)
+
+
+def get_prefixed_range(from_int, to_int, prefix, max_size=max_range_size):
+    # Per-row trace, only formatted when DEBUG logging is enabled (--trace)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"Getting {to_int-from_int} elements. prefixed range {from_int} to {to_int} prefix:{prefix}.")
+
+    if max_size is not None and abs(from_int - to_int) > max_size:
         logging.error(f"Range too large from {from_int} to {to_int}.")
         return []
 
@@ -59,51 +61,18 @@ def get_prefixed_range(from_int, to_int, prefix):
 
 def get_total_rows(text):
     """Get the total number of rows for a given range string with a - splitting from and to integers."""
-    try:
-        if text is np.nan or text is None or text == '':
-            return 0
-        text1 = text.replace("[", "").replace("]", "").replace(" ", "")
-        logging.info(f"Filtered text for total rows: {text1}.")
-        if '-' in text1:
-            start, end = text1.split('-')
-            start_int = int(re.sub(r'^[A-Za-z]+', '', start))
-            end_int = int(re.sub(r'^[A-Za-z]+', '', end))
-            total = abs(end_int - start_int) + 1
-            logging.info(f"Total rows for range {text}: {total}.")
-            return total
-        else:
-            return 1
-
-    except Exception:
-        logging.error(f"Getting total Rows for text: {text}")
-        return 0    
+    return count_range(text)
 
 
-def get_range(text):
+def get_range(text, max_size=max_range_size):
     """Parse a range string and return a list of values."""
-    try:
-        text = text.replace("[", "").replace("]", "").replace(" ", "")
-    except Exception:
-        logging.error(f"Getting Range for text: {text}")
-        return []
-
-    if '-' in text:
-        start, end = text.split('-')
-        try:
-            start_int = int(re.sub(r'^[A-Za-z]+', '', start))
-            end_int = int(re.sub(r'^[A-Za-z]+', '', end))
-            match = re.match(r'^[A-Za-z]+', start)
-            prefix_start = match.group(0) if match else ''
-            if start[0].isalpha() and end[0].isalpha():
-                return get_prefixed_range(start_int, end_int, prefix_start)
-            else:
-                return get_prefixed_range(start_int,end_int,'')
-        except Exception:
-            print(f"Error converting text: {text}.")
-
-        return [start, end]
-    else:
-        return [text]
+    result = []
+    for segment in parse_range(text):
+        if segment.literal is None:
+            result.extend(get_prefixed_range(segment.start, segment.end, segment.prefix, max_size))
+        else:
+            result.extend(literal_values(segment.literal))
+    return result
 
 
 def get_last_first_value_not_null(df, col_name, row_nr):
@@ -123,75 +92,250 @@ def fill_columns(df, index, level):
             df.at[index, col_name] = fix_value
 
 
-def calculate_hierarchy(csv_file_path, last_col_name):
-    """Main function to calculate and fix hierarchy from a CSV file."""
+def prepare_hierarchy(csv_file_path, last_col_name, fill_mode="first", metrics=None):
+    """Read a hierarchy CSV, fill its levels and return it with the keysn leaf block boundaries."""
+    metrics = metrics or Metrics()
+    with metrics.span("read"):
+        df = pd.read_csv(csv_file_path, skip_blank_lines=True)
+        df["Level_Nr"] = df["Level_Nr"].astype("Int64")
+    metrics.count("rows_in", len(df))
+
+    with metrics.span("level_fill"):
+        backfill_levels(df, first_level=1, fill_mode=fill_mode)
+
+    with metrics.span("key_detection"):
+        keysx = find_keys(df, last_col_name)
+        keysn = [x + 1 for x in keysx]
+        keysn.reverse()
+    metrics.count("ranges_parsed", len(keysx) - 1)
+    return df, keysn
+
+
+def build_account_index(csv_file_path, last_col_name, fill_mode="first"):
+    """Build an AccountIndex for a hierarchy CSV without expanding its ranges."""
+    df, keysn = prepare_hierarchy(csv_file_path, last_col_name, fill_mode)
+    return AccountIndex.from_frame(df, keysn, last_col_name)
+
+
+def calculate_hierarchy(csv_file_path, last_col_name, fill_mode="first", streaming=False, chunk_size=100000,
+                        metrics=None, output_format="csv"):
+    """Main function to calculate and fix hierarchy from a CSV file.
+
+    fill_mode selects how missing Level_i values are back-filled: "first" keeps the
+    first non-null value from the top (the fill_columns behaviour), "ancestor" uses
+    the nearest ancestor of the current branch.
+
+    With streaming=True the expanded rows are appended to the output file one leaf
+    block (at most chunk_size rows) at a time, so memory is bounded by the largest
+    chunk instead of the whole output and ranges above max_range_size are expanded.
+
+    Phase timings and counters are added to metrics when one is passed.
+
+    output_format "parquet" or "arrow" writes *_new.parquet / *_new.arrows with
+    dictionary-encoded text columns and an integer range column (see hierarchy_output).
+    """
+    metrics = metrics or Metrics()
     print(f"Calculate Hierarchy for {csv_file_path}.")
-    df = pd.read_csv(csv_file_path, skip_blank_lines=True)
-    df["Level_Nr"] = df["Level_Nr"].astype("Int64")
-
-    for index, row in df.iterrows():
-        if pd.notna(row["Level_Nr"]):
-            fill_columns(df, index, row["Level_Nr"])
-
-    new_df = pd.DataFrame(columns=df.columns)
-    keysx = [-1]
-    for i, row in df.iterrows():
-        if not pd.isna(row[last_col_name]):
-            keysx.append(i)
-
-    for x in range(len(keysx) - 1):
-        df.iloc[keysx[x] + 1:keysx[x + 1], :-1] = df.iloc[keysx[x] + 1:keysx[x + 1], :-1].ffill()
-
-    keysn = [x + 1 for x in keysx]
-    keysn.reverse()
-
-    # Add new column to df with number of new rows to be created
-    COL_NR_ROWS = "nr_rows"
-    COL_ACCOUNT_RANGE = "Account_Range"
-    df[COL_NR_ROWS] = 0
-
-    # If Account_Range is not null and does not contain a range, set nr_rows to 1 else set to number of elements in range
-    for i, row in df.iterrows():
-        # update te row in the dataframe
-        if pd.notna(row[COL_ACCOUNT_RANGE]):
-            if '-' not in row[COL_ACCOUNT_RANGE]:
-                df.at[i, COL_NR_ROWS] = 1
-            else:
-                df.at[i, COL_NR_ROWS] = get_total_rows(row[COL_ACCOUNT_RANGE])
+    df, keysn = prepare_hierarchy(csv_file_path, last_col_name, fill_mode, metrics)
+
+    with metrics.span("row_counting"):
+        # Add new column to df with number of new rows to be created
+        COL_NR_ROWS = "nr_rows"
+        COL_ACCOUNT_RANGE = "Account_Range"
+        df[COL_NR_ROWS] = 0
+
+        # Set nr_rows to the number of elements in Account_Range (1 for a single value, 0 when empty)
+        ranges = parse_range_column(df[COL_ACCOUNT_RANGE])
+        df[COL_NR_ROWS] = np.bincount(ranges.row, weights=ranges.count, minlength=len(df)).astype("int64")
+    metrics.count("range_segments", len(ranges.row))
 
     # print a summary of nr_rows including total number of new rows to be created
     total_new_rows = df[COL_NR_ROWS].sum()
-    logging.info(f"Total new rows to be created: {total_new_rows}")
+    logger.info(f"Total new rows to be created: {total_new_rows}")
+
+    _, filename = get_filenames(csv_file_path)
+    new_path = new_output_path(csv_file_path, output_format)
+    if streaming:
+        rows_out = write_hierarchy_stream(df, keysn, last_col_name, new_path, filename, chunk_size, metrics,
+                                          output_format)
+        metrics.count("rows_out", rows_out)
+        return len(df), rows_out
 
     # Denormalize the ranges in the last column
-    results = []
-    for x in range(len(keysn)-1):
-        if (keysn[x] - keysn[x+1]) == 1:       
-            c = df.at[keysn[x+1], last_col_name]
-            results.extend(get_range(c))
-        else:
-            if (x > 0):
-                c = df.at[keysn[x]-1, last_col_name]
-                results.extend(get_range(c))        
-            res1 = apply_results(results, keysn[x+1], keysn[x], df)
+    with metrics.span("expansion"):
+        new_df = expand_blocks(df, keysn, last_col_name, get_range)
+
+    with metrics.span("write"):
+        new_df["filename"] = filename
+        with HierarchyWriter(new_path, output_format, last_col_name) as writer:
+            writer.write(new_df)
+    metrics.count("rows_out", len(new_df))
+    return len(df), len(new_df)
+
+
+def write_hierarchy_stream(df, keysn, last_col_name, new_path, filename, chunk_size=100000, metrics=None,
+                           output_format="csv"):
+    """Append the denormalized rows to new_path block by block and return the number of rows written."""
+    metrics = metrics or Metrics()
+    rows_out = 0
+    with HierarchyWriter(new_path, output_format, last_col_name) as writer:
+        writer.write(df.iloc[:0].assign(filename=filename))
+        unbounded_range = partial(get_range, max_size=None)
+        chunks = iter_expanded_chunks(df, keysn, last_col_name, unbounded_range, chunk_size)
+        while True:
+            with metrics.span("expansion"):
+                chunk = next(chunks, None)
+            if chunk is None:
+                break
+            with metrics.span("write"):
+                chunk["filename"] = filename
+                writer.write(chunk)
+            rows_out += len(chunk)
+    return rows_out
+
+
+def new_output_path(csv_file_path, output_format="csv"):
+    """Return the path calculate_hierarchy writes its output to for csv_file_path."""
+    return output_path(get_filenames(csv_file_path)[0], output_format)
+
+
+def find_hierarchy_files(directory, patterns):
+    """Return all files below directory whose name matches one of the glob patterns, skipping *_new outputs."""
+    matches = []
+    for root, _, files in os.walk(directory):
+        for file in sorted(files):
+            name, _ = os.path.splitext(file)
+            if name.endswith('_new'):
+                continue
+            if any(fnmatch.fnmatch(file, pattern) for pattern in patterns):
+                matches.append(os.path.join(root, file))
+    return matches
+
+
+def process_file(csv_file_path, last_col_name, fill_mode="first", streaming=False, output_format="csv"):
+    """Run calculate_hierarchy on one file and return its statistics instead of raising."""
+    start = time.perf_counter()
+    metrics = Metrics()
+    result = {"file": csv_file_path, "rows_in": 0, "rows_out": 0, "seconds": 0.0, "error": None}
+    try:
+        result["rows_in"], result["rows_out"] = calculate_hierarchy(csv_file_path, last_col_name, fill_mode, streaming,
+                                                                    metrics=metrics, output_format=output_format)
+    except Exception as e:
+        logging.error(f"Processing {csv_file_path} failed: {e}")
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start
+    result["metrics"] = metrics.to_dict()
+    return result
 
-            new_df = pd.concat([new_df, res1], ignore_index=True)
-            results = []
 
-    new_csv_path, filename = get_filenames(csv_file_path)
-    new_df["filename"] = filename
-    new_df.to_csv(new_csv_path, index=False)
+def print_summary(results):
+    """Print rows in, rows out and wall time for every processed file."""
+    print(f"{'File':<60} {'Rows in':>10} {'Rows out':>12} {'Seconds':>9}  Status")
+    for r in results:
+        status = r["error"] or ("cached" if r.get("cached") else "ok")
+        print(f"{os.path.basename(r['file']):<60} {r['rows_in']:>10} {r['rows_out']:>12} {r['seconds']:>9.2f}  {status}")
+    failed = sum(1 for r in results if r["error"])
+    cached = sum(1 for r in results if r.get("cached"))
+    print(f"{len(results)} files, {sum(r['rows_in'] for r in results)} rows in, "
+          f"{sum(r['rows_out'] for r in results)} rows out, {cached} cached, {failed} failed.")
 
 
-def list_csv_last_parts(directory='.'):
-    """Process all CSV files in the given directory and its subdirectories."""
-    for root, _, files in os.walk(directory):
-        for file in files:
-            if file.endswith('PS_TREE_ACCOUNT_AC_RAP_ACC_AEGONNL_AEGON_01_01_2015.csv'):
-                print(f"Processing file: {file}")
-                calculate_hierarchy(os.path.join(root, file), last_col_name)
+def init_worker(log_level):
+    """Set up logging in a worker process; with spawn (Windows, macOS) it does not inherit the parent's."""
+    logging.basicConfig(level=log_level)
+
+
+def list_csv_last_parts(directory='.', fill_mode="first", patterns=None, workers=1, streaming=False,
+                        metrics_json=None, output_format="csv", force=False):
+    """Process all matching CSV files in the given directory and its subdirectories.
 
+    Files are matched on their name against the glob patterns and processed on a
+    pool of `workers` processes; a failing file is reported in the summary and does
+    not stop the others. The summary ends with the phase timings of all files, which
+    are also written to metrics_json together with the per-file results if given.
 
-# Start processing hierarchy files from the specified directory
-logging.info("Starting to process hierarchy files...")
-list_csv_last_parts(".")
+    A file whose content, parameters and code version match the cache manifest in
+    directory keeps its existing *_new output, unless force is set.
+    """
+    cache = HierarchyCache(directory)
+    # Every option that changes the *_new output; streaming lifts the max_range_size cap
+    params = {"last_col_name": last_col_name, "fill_mode": fill_mode, "output_format": output_format,
+              "streaming": streaming, "max_range_size": None if streaming else max_range_size}
+    results = []
+    files = []
+    digests = {}
+    for file in find_hierarchy_files(directory, patterns or [default_pattern]):
+        digests[file] = file_hash(file)
+        entry = None if force else cache.lookup(file, digests[file], params, new_output_path(file, output_format))
+        if entry is None:
+            files.append(file)
+        else:
+            results.append({"file": file, "rows_in": entry["rows_in"], "rows_out": entry["rows_out"], "seconds": 0.0,
+                            "error": None, "cached": True, "metrics": Metrics().to_dict()})
+
+    if workers <= 1:
+        for file in files:
+            print(f"Processing file: {file}")
+            results.append(process_file(file, last_col_name, fill_mode, streaming, output_format))
+    else:
+        # --trace and the log level are passed on, the phase metrics come back in the results
+        log_level = logging.getLogger().getEffectiveLevel()
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(log_level,)) as executor:
+            futures = {executor.submit(process_file, file, last_col_name, fill_mode, streaming, output_format): file for file in files}
+            for future in as_completed(futures):
+                file = futures[future]
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    # The worker process itself died, e.g. out of memory
+                    logging.error(f"Processing {file} failed: {e}")
+                    results.append({"file": file, "rows_in": 0, "rows_out": 0, "seconds": 0.0,
+                                    "error": f"{type(e).__name__}: {e}", "metrics": Metrics().to_dict()})
+
+    for r in results:
+        if not r["error"] and not r.get("cached"):
+            cache.record(r["file"], digests[r["file"]], params, new_output_path(r["file"], output_format),
+                         r["rows_in"], r["rows_out"])
+    cache.save()
+
+    order = list(digests)
+    results.sort(key=lambda r: order.index(r["file"]))
+    print_summary(results)
+    total = Metrics()
+    for r in results:
+        total.merge(r["metrics"])
+    total.print_summary()
+    if metrics_json:
+        total.write_json(metrics_json, files=results)
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fix and denormalize PS_TREE hierarchy exports.")
+    parser.add_argument("patterns", nargs="*", default=[default_pattern],
+                        help="Glob patterns matched against the file names, e.g. 'PS_TREE_*.csv'.")
+    parser.add_argument("--directory", default=".", help="Directory to search recursively.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes.")
+    parser.add_argument("--fill-mode", choices=FILL_MODES, default="first",
+                        help="'first' keeps the first non-null level value from the top, 'ancestor' uses the nearest ancestor of the branch.")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Append expanded rows block by block to bound memory and lift the range size cap.")
+    parser.add_argument("--output-format", choices=OUTPUT_FORMATS, default="csv",
+                        help="Format of the *_new files; parquet and arrow need pyarrow.")
+    parser.add_argument("--metrics-json", help="Write the phase timings and counters to this JSON file.")
+    parser.add_argument("--trace", action="store_true", help="Log every range that is expanded (slow on large trees).")
+    parser.add_argument("--force", action="store_true", help="Reprocess files even if the cache says they are unchanged.")
+    parser.add_argument("--clean-cache", action="store_true", help="Remove the cache manifest of --directory and exit.")
+    args = parser.parse_args()
+
+    if args.clean_cache:
+        HierarchyCache(args.directory).clean()
+        print(f"Removed hierarchy cache in {args.directory}")
+        raise SystemExit(0)
+
+    logging.basicConfig(level=logging.DEBUG if args.trace else logging.INFO)
+
+    # Start processing hierarchy files from the specified directory
+    logger.info("Starting to process hierarchy files...")
+    list_csv_last_parts(args.directory, args.fill_mode, args.patterns, args.workers, args.streaming, args.metrics_json,
+                        args.output_format, args.force)